@@ -0,0 +1,133 @@
+import logging
+import re
+
+from agents.resume_classifier import SECTION_RE
+from agents.resume_matcher import estimate_tokens
+from config.settings import RESUME_TOKEN_BUDGET
+
+BOILERPLATE_RE = re.compile(
+    r"^(?:page \d+(?: of \d+)?|\d+\s*/\s*\d+|\d+|curriculum vitae|resume|cv|"
+    r"references (?:are )?available (?:up)?on request\.?|[\W_]+)$",
+    re.IGNORECASE,
+)
+
+# Canonical section for each header SECTION_RE recognises
+SECTION_GROUPS = {
+    "experience": "experience", "employment": "experience", "employment history": "experience",
+    "work history": "experience", "internship": "experience", "internships": "experience",
+    "skills": "skills", "competencies": "skills", "qualifications": "skills",
+    "summary": "summary", "profile": "summary", "objective": "summary",
+    "projects": "projects",
+    "education": "education", "academic background": "education",
+    "certification": "certifications", "certifications": "certifications", "licenses": "certifications",
+    "achievements": "achievements", "awards": "achievements", "publications": "achievements",
+    "languages": "other", "volunteering": "other",
+    "references": "references",
+}
+
+# Order sections are kept in when the budget runs out; "header" is whatever
+# precedes the first recognised section (name, contact details, intro)
+SECTION_PRIORITY = (
+    "experience", "skills", "header", "summary", "projects", "education",
+    "certifications", "achievements", "other", "references",
+)
+
+# Lines this short ("Python", "2019 - 2021") are only deduplicated when they
+# repeat back to back or repeat one of the document's first HEADER_LINES
+# lines (a running page header); longer ones are dropped on any repeat
+MIN_DEDUPE_CHARS = 20
+HEADER_LINES = 5
+
+def clean_lines(text):
+    """
+    Whitespace-normalised lines of `text` without page furniture, repeated
+    headers/footers or the DOCX table cells that repeat the body.
+    """
+    seen = set()
+    header = set()
+    previous = None
+    lines = []
+    for raw in text.splitlines():
+        line = " ".join(raw.split())
+        if not line or BOILERPLATE_RE.match(line):
+            continue
+        key = line.lower()
+        if key == previous or (key in seen and (len(key) >= MIN_DEDUPE_CHARS or key in header)):
+            continue
+        seen.add(key)
+        previous = key
+        lines.append(line)
+        if len(lines) <= HEADER_LINES:
+            header.add(key)
+    return lines
+
+def split_sections(lines):
+    """
+    {section: [lines]} with each section's header line kept as its first line.
+    """
+    sections = {}
+    current = "header"
+    for line in lines:
+        match = SECTION_RE.match(line)
+        if match:
+            current = SECTION_GROUPS.get(match.group(1).lower(), "other")
+        sections.setdefault(current, []).append(line)
+    return sections
+
+def condense(text, budget=RESUME_TOKEN_BUDGET):
+    """
+    Prompt-ready version of a resume: cleaned lines regrouped by section
+    priority (experience and skills first), cut off at roughly `budget`
+    tokens; the line that crosses the budget is truncated to fit. A budget
+    of 0 or less only cleans.
+    """
+    sections = split_sections(clean_lines(text))
+    kept = []
+    used = 0
+    for name in SECTION_PRIORITY:
+        for line in sections.get(name, []):
+            cost = estimate_tokens(line)
+            if budget > 0 and used + cost > budget:
+                kept.append(truncate(line, budget - used))
+                return "\n".join(filter(None, kept))
+            kept.append(line)
+            used += cost
+    return "\n".join(kept)
+
+def truncate(line, tokens):
+    """
+    Leading words of `line` within `tokens` (a hard cut when the first word
+    alone is over), or "" when nothing fits.
+    """
+    chars = 4 * (tokens - 1)
+    if chars <= 0:
+        return ""
+    cut = line[:chars]
+    if " " in cut and line[chars:chars + 1] not in ("", " "):
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip()
+
+def condense_resumes(state):
+    """
+    Attach a `condensed` text to each resume MatchResumes will score, so its
+    prompts carry the budgeted text instead of the raw extraction.
+    """
+    shortlist = state.get("shortlist")
+    if shortlist is None:
+        shortlist = state.get("parsed_resumes", [])
+
+    condensed = []
+    before_total = after_total = 0
+    for r in shortlist:
+        text = r.get("text", "")
+        short = condense(text)
+        before, after = estimate_tokens(text), estimate_tokens(short)
+        before_total += before
+        after_total += after
+        logging.info(f"Condensed resume (name: {r.get('name', 'N/A')}): {before} -> {after} tokens")
+        condensed.append({**r, "condensed": short})
+    logging.info(
+        "Condensed %d resumes for %s: %d -> %d prompt tokens (budget %d per resume)",
+        len(condensed), state.get("job", {}).get("title", ""), before_total, after_total, RESUME_TOKEN_BUDGET
+    )
+    return {"shortlist": condensed}
@@ -0,0 +1,168 @@
+import io
+import logging
+import os
+import re
+import struct
+import tempfile
+
+import fitz    # PyMuPDF
+import docx
+import textract
+
+try:
+    import olefile
+except ImportError:  # legacy .doc then always goes through textract
+    olefile = None
+
+from config.settings import PDF_MAX_PAGES
+
+# kind -> {"extensions", "mime_types", "magic", "extract"}; see register()
+FORMATS = {}
+
+
+def register(kind, extensions, mime_types, magic):
+    """
+    Add an extractor for `kind`. Files are matched by leading magic bytes
+    first, then Drive MIME type, then (case-insensitive) extension.
+    """
+    def wrap(extract):
+        FORMATS[kind] = {
+            "extensions": tuple(extensions),
+            "mime_types": tuple(mime_types),
+            "magic": tuple(magic),
+            "extract": extract,
+        }
+        return extract
+    return wrap
+
+def detect_format(name, data=None, mime_type=None):
+    """
+    Format kind for a file, or None when no extractor handles it.
+    """
+    if data:
+        for kind, fmt in FORMATS.items():
+            if data.startswith(fmt["magic"]):
+                return kind
+    for kind, fmt in FORMATS.items():
+        if mime_type in fmt["mime_types"]:
+            return kind
+    lowered = (name or "").lower()
+    for kind, fmt in FORMATS.items():
+        if lowered.endswith(fmt["extensions"]):
+            return kind
+    return None
+
+def extract_text(name, data):
+    """
+    Extract plain text from downloaded file bytes with the extractor for its
+    detected format.
+    """
+    kind = detect_format(name, data)
+    if kind is None:
+        raise ValueError(f"Unsupported file type: {name}")
+    logging.info("Parsing %s: %s", kind.upper(), name)
+    return FORMATS[kind]["extract"](data)
+
+
+@register("pdf", [".pdf"], ["application/pdf"], [b"%PDF-"])
+def extract_pdf(data):
+    # Resumes that run past PDF_MAX_PAGES are portfolios or scans; the first
+    # pages carry what scoring needs
+    with fitz.open(stream=data, filetype="pdf") as d:
+        pages = d.page_count if PDF_MAX_PAGES <= 0 else min(d.page_count, PDF_MAX_PAGES)
+        return "\n".join(d[i].get_text() for i in range(pages))
+
+
+@register(
+    "docx", [".docx"],
+    ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"],
+    [b"PK\x03\x04"],
+)
+def extract_docx(data):
+    d = docx.Document(io.BytesIO(data))
+    parts = [p.text for p in d.paragraphs]
+    for tbl in d.tables:
+        # Merged cells come back once per grid position they span; keep the
+        # first occurrence of each underlying <w:tc>
+        seen = set()
+        for row in tbl.rows:
+            for cell in row.cells:
+                if cell._tc in seen:
+                    continue
+                seen.add(cell._tc)
+                parts.append(cell.text)
+    return "\n".join(parts)
+
+
+# Word field markers: begin, separator (code -> result), end
+FIELD_CODE_RE = re.compile(r"\x13[^\x13\x14\x15]*(?:\x14|\x15)")
+WORD_CONTROL = str.maketrans({
+    "\r": "\n", "\x07": "\n", "\x0b": "\n", "\x0c": "\n",  # paragraph, cell/row, line, page
+    "\x1e": "-", "\x1f": "", "\xa0": " ", "\x14": "", "\x15": "",
+})
+
+def word97_text(data):
+    """
+    Main-document text of a Word 97-2003 file, read straight from its piece
+    table (the CLX in the table stream) without a converter process.
+    """
+    ole = olefile.OleFileIO(data)
+    try:
+        word = ole.openstream("WordDocument").read()
+        ident, _, _, _, _, flags = struct.unpack_from("<HHHHHH", word, 0)
+        if ident != 0xA5EC:
+            raise ValueError("not a Word 97+ document")
+        if flags & 0x0100:
+            raise ValueError("document is encrypted")
+        table = ole.openstream("1Table" if flags & 0x0200 else "0Table").read()
+    finally:
+        ole.close()
+
+    ccp_text = struct.unpack_from("<i", word, 0x4C)[0]
+    fc_clx, lcb_clx = struct.unpack_from("<iI", word, 0x1A2)
+    clx = table[fc_clx:fc_clx + lcb_clx]
+    pos = 0
+    while pos < len(clx) and clx[pos] == 0x01:  # skip Prc property blocks
+        pos += 3 + struct.unpack_from("<H", clx, pos + 1)[0]
+    if pos >= len(clx) or clx[pos] != 0x02:
+        raise ValueError("piece table not found")
+    lcb = struct.unpack_from("<I", clx, pos + 1)[0]
+    plc = clx[pos + 5:pos + 5 + lcb]
+    n = (lcb - 4) // 12
+    cps = struct.unpack_from(f"<{n + 1}i", plc, 0)
+
+    parts = []
+    for i in range(n):
+        fc = struct.unpack_from("<I", plc, 4 * (n + 1) + 8 * i + 2)[0]
+        count = cps[i + 1] - cps[i]
+        if fc & 0x40000000:
+            start = (fc & 0x3FFFFFFF) // 2
+            parts.append(word[start:start + count].decode("cp1252", "replace"))
+        else:
+            parts.append(word[fc:fc + 2 * count].decode("utf-16-le", "replace"))
+    text = "".join(parts)[:ccp_text]
+
+    previous = None
+    while previous != text:  # nested fields unwrap from the inside out
+        previous, text = text, FIELD_CODE_RE.sub("", text)
+    text = text.translate(WORD_CONTROL)
+    return "".join(ch for ch in text if ch >= " " or ch in "\n\t")
+
+def textract_doc(data):
+    # textract needs a path; spill to a private temp file and remove it afterwards
+    fd, path = tempfile.mkstemp(suffix=".doc")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        return textract.process(path).decode("utf-8")
+    finally:
+        os.unlink(path)
+
+@register("doc", [".doc"], ["application/msword"], [b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"])
+def extract_doc(data):
+    if olefile is not None:
+        try:
+            return word97_text(data)
+        except Exception as e:
+            logging.info("Piece-table extraction failed (%s), falling back to textract", e)
+    return textract_doc(data)
@@ -0,0 +1,107 @@
+import logging
+import re
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+from agents.resume_matcher import extract_email
+from agents.resume_classifier import classify_resume
+from config.settings import PREFILTER_THRESHOLD, PREFILTER_TOP_K, PREFILTER_FEATURES
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or our "
+    "that the their this to was we were will with you your".split()
+)
+PREFILTER_STATUS = "Not Suitable (prefilter)"
+
+def hashed_terms(text, n_features=PREFILTER_FEATURES):
+    """
+    Hashed unigram and bigram buckets for `text`. crc32 keeps the buckets
+    stable across processes, unlike hash().
+    """
+    tokens = [t.rstrip(".") for t in TOKEN_RE.findall(text.lower())]
+    tokens = [t for t in tokens if t and t not in STOP_WORDS]
+    terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(t.encode("utf-8")) % n_features for t in terms]
+
+def tfidf_matrix(texts, n_features=PREFILTER_FEATURES):
+    """
+    L2-normalised sublinear TF-IDF rows for `texts`, as one CSR matrix.
+    """
+    rows, cols = [], []
+    for i, text in enumerate(texts):
+        buckets = hashed_terms(text, n_features)
+        rows.extend([i] * len(buckets))
+        cols.extend(buckets)
+    counts = sparse.csr_matrix(
+        (np.ones(len(cols), dtype=np.float32), (rows, cols)),
+        shape=(len(texts), n_features)
+    )
+    counts.sum_duplicates()
+    counts.data = 1.0 + np.log(counts.data)
+
+    df = np.bincount(counts.indices, minlength=n_features)
+    idf = np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0
+    weighted = (counts @ sparse.diags(idf.astype(np.float32))).tocsr()
+
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ weighted
+
+def similarities(texts, query):
+    """
+    Cosine similarity of every text to `query`, in one sparse product.
+    """
+    matrix = tfidf_matrix(list(texts) + [query])
+    return np.asarray((matrix[:-1] @ matrix[-1].T).todense()).ravel()
+
+def shortlist(texts, query, threshold=PREFILTER_THRESHOLD, top_k=PREFILTER_TOP_K):
+    """
+    Indices of the texts worth an LLM call: similarity at or above
+    `threshold`, limited to the `top_k` best when `top_k` > 0. Returns
+    (sorted indices, similarities).
+    """
+    if not texts:
+        return [], np.zeros(0)
+    sims = similarities(texts, query)
+    ranked = [i for i in np.argsort(-sims, kind="stable") if sims[i] >= threshold]
+    if top_k > 0:
+        ranked = ranked[:top_k]
+    return sorted(int(i) for i in ranked), sims
+
+def prefilter_resumes(state):
+    """
+    Rank parsed resumes against the job locally and pass only the shortlist
+    to MatchResumes. Per-role `prefilter_threshold` / `prefilter_top_k` on
+    the job override the defaults. Rejected documents the local classifier
+    is confident are not resumes are dropped rather than reported as
+    unsuitable candidates.
+    """
+    job = state.get("job", {})
+    parsed = state.get("parsed_resumes", [])
+    query = f"{job.get('title', '')}\n{job.get('responsibilities', '')}"
+    threshold = float(job.get("prefilter_threshold", PREFILTER_THRESHOLD))
+    top_k = int(job.get("prefilter_top_k", PREFILTER_TOP_K))
+
+    keep, sims = shortlist([r.get("text", "") for r in parsed], query, threshold, top_k)
+    kept = set(keep)
+    rejected = [
+        {
+            "name": r.get("name", ""),
+            "file_id": r.get("id"),
+            "score": 0,
+            "status": PREFILTER_STATUS,
+            "email": extract_email(r.get("text", ""))
+        }
+        for i, r in enumerate(parsed)
+        if i not in kept and classify_resume(r.get("text", "")) is not False
+    ]
+    dropped = len(parsed) - len(keep) - len(rejected)
+    logging.info(
+        "Prefilter for %s: %d of %d resumes shortlisted (threshold %.3f, top_k %d), %d non-resumes dropped, "
+        "%d LLM calls avoided",
+        job.get("title", ""), len(keep), len(parsed), threshold, top_k, dropped, 2 * (len(parsed) - len(keep))
+    )
+    return {"shortlist": [parsed[i] for i in keep], "prefiltered": rejected}
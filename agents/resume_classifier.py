@@ -0,0 +1,67 @@
+import math
+import re
+
+from config.settings import RESUME_CLASSIFIER_ACCEPT, RESUME_CLASSIFIER_REJECT
+
+SECTION_RE = re.compile(
+    r"^[\W\d_]*(?:professional |work |relevant |technical |key |core )?"
+    r"(experience|employment(?: history)?|work history|education|academic background|"
+    r"skills|competencies|qualifications|summary|profile|objective|projects|"
+    r"certifications?|licenses|languages|references|achievements|awards|volunteering|"
+    r"publications|internships?)\b[\W\s]{0,3}$",
+    re.IGNORECASE | re.MULTILINE,
+)
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_RE = re.compile(r"(?<!\d)\+?\d[\d\s().-]{7,}\d(?!\d)")
+DATE_RANGE_RE = re.compile(
+    r"\b(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?(?:19|20)\d{2}"
+    r"\s*(?:-|–|—|to)\s*"
+    r"(?:(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?(?:19|20)\d{2}|present|current|now|date)\b",
+    re.IGNORECASE,
+)
+NON_RESUME_RE = re.compile(
+    r"\b(invoice|receipt|amount due|dear (?:sir|madam|hiring)|sincerely|terms and conditions|"
+    r"table of contents|chapter \d|abstract|meeting minutes|agenda|purchase order|job description)\b",
+    re.IGNORECASE,
+)
+
+def resume_features(text):
+    words = len(text.split())
+    return {
+        "sections": len({m.group(1).lower() for m in SECTION_RE.finditer(text)}),
+        "email": bool(EMAIL_RE.search(text)),
+        "phone": bool(PHONE_RE.search(text)),
+        "date_ranges": len(DATE_RANGE_RE.findall(text)),
+        "words": words,
+        "non_resume_markers": len({m.group(1).lower() for m in NON_RESUME_RE.finditer(text)}),
+    }
+
+def resume_probability(text):
+    """
+    Probability that `text` is a resume/CV, from structural and lexical cues
+    (section headers, contact details, date ranges, length, non-resume
+    phrases) combined in a hand-weighted logistic score.
+    """
+    f = resume_features(text)
+    z = -4.0
+    z += 1.6 * min(f["sections"], 4)
+    z += 1.5 if f["email"] else 0.0
+    z += 1.0 if f["phone"] else 0.0
+    z += 1.0 if f["date_ranges"] >= 1 else 0.0
+    z += 0.5 if f["date_ranges"] >= 3 else 0.0
+    z -= 2.0 if f["words"] < 60 else 0.0
+    z -= 1.0 if f["words"] > 4000 else 0.0
+    z -= 2.0 * min(f["non_resume_markers"], 3)
+    return 1.0 / (1.0 + math.exp(-z))
+
+def classify_resume(text, accept=RESUME_CLASSIFIER_ACCEPT, reject=RESUME_CLASSIFIER_REJECT):
+    """
+    True/False when the local score is confident either way, None when the
+    caller should ask the LLM.
+    """
+    p = resume_probability(text)
+    if p >= accept:
+        return True
+    if p <= reject:
+        return False
+    return None
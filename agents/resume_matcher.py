@@ -1,100 +1,434 @@
+import hashlib
 import json
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
-from config.settings import GEMINI_MODEL
+from config.settings import (
+    GEMINI_MODEL, GEMINI_CONCURRENCY, GEMINI_RPM, GEMINI_BURST,
+    GEMINI_BATCH_SIZE, GEMINI_BATCH_TOKEN_BUDGET, GEMINI_MULTI_ROLE,
+    LLM_CACHE_TTL_SECONDS, LLM_CACHE_MEMORY_SIZE, LLM_CACHE_MAX_ENTRIES,
+    NEAR_DUPLICATE_ACTION, NEAR_DUPLICATE_THRESHOLD, MINHASH_PERMUTATIONS, MINHASH_BANDS,
+)
+from database.cache import TwoTierCache
+from database.near_duplicates import NearDuplicateIndex
+from agents.resume_classifier import classify_resume
+from services.rate_limit import TokenBucket
+from services.resilience import policies
+from services.metrics import inc, propagate
 import logging
-import os
-
-# Setup logging
-log_dir = ".logs"
-os.makedirs(log_dir, exist_ok=True)
-log_path = os.path.join(log_dir, "agents.log")
-logging.basicConfig(
-    filename=log_path,
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
+
+# Shared by every match_resumes call so concurrent roles stay under one quota
+gemini_limiter = TokenBucket(GEMINI_RPM, GEMINI_BURST)
+
+# Bump whenever a prompt below changes so stale verdicts are not reused
+PROMPT_VERSION = "1"
+verdict_cache = TwoTierCache("llm_cache", LLM_CACHE_TTL_SECONDS, LLM_CACHE_MEMORY_SIZE, LLM_CACHE_MAX_ENTRIES)
+
+# Scored resumes per job, so lightly edited resubmissions can skip Gemini
+near_duplicates = NearDuplicateIndex(
+    "resume_signatures", NEAR_DUPLICATE_THRESHOLD, LLM_CACHE_TTL_SECONDS, MINHASH_PERMUTATIONS, MINHASH_BANDS
 )
 
-def match_resumes(state):
-    def extract_email(text):
-        # Simple regex for email extraction
-        match = re.search(r'[\w\.-]+@[\w\.-]+', text)
-        return match.group(0) if match else ""
-
-    def extract_first_json(text):
-        cleaned = re.sub(r"^```(?:json)?\s*|```$", "", text.strip(), flags=re.MULTILINE).strip()
-        match = re.search(r"\{.*?\}", cleaned, re.DOTALL)
-        if match:
-            return json.loads(match.group(0))
-        raise ValueError("No JSON object found in response")
-
-    def is_resume(text, model):
+# How is_resume verdicts were reached; local ones cost no Gemini call
+verdict_counts = {"local": 0, "llm": 0}
+verdict_lock = threading.Lock()
+
+def count_verdict(source):
+    with verdict_lock:
+        verdict_counts[source] += 1
+
+def cache_key(kind, *parts):
+    payload = json.dumps([kind, PROMPT_VERSION, GEMINI_MODEL, *parts])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def cached(cache, key, compute):
+    if cache is None:
+        return compute()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
+
+def extract_email(text):
+    # Simple regex for email extraction
+    match = re.search(r'[\w\.-]+@[\w\.-]+', text)
+    return match.group(0) if match else ""
+
+def extract_first_json(text):
+    cleaned = re.sub(r"^```(?:json)?\s*|```$", "", text.strip(), flags=re.MULTILINE).strip()
+    match = re.search(r"\{.*?\}", cleaned, re.DOTALL)
+    if match:
+        return json.loads(match.group(0))
+    raise ValueError("No JSON object found in response")
+
+def generate(model, prompt, limiter=None):
+    # Every retry spends its own token from the RPM budget, waited for
+    # outside the timed attempt and its concurrency slot
+    response = policies["gemini"].call(model.generate_content, prompt, operation="generate_content",
+                                       before_attempt=(limiter or gemini_limiter).acquire)
+    text = response.text.strip()
+    # Gemini reports exact counts in usage_metadata; estimate when it does not
+    usage = getattr(response, "usage_metadata", None)
+    inc("recruitment_gemini_prompt_tokens_total", getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt))
+    inc("recruitment_gemini_response_tokens_total", getattr(usage, "candidates_token_count", None) or estimate_tokens(text))
+    return text
+
+def prompt_text(r):
+    # CondenseResumes' budgeted text when it ran, the raw extraction otherwise
+    return r.get('condensed') or r.get('text', '')
+
+def is_resume(text, model, limiter=None, cache=None, condensed=None):
+    # Confident local classification skips Gemini entirely
+    verdict = classify_resume(text)
+    if verdict is not None:
+        count_verdict("local")
+        return verdict
+    count_verdict("llm")
+    text = condensed or text
+
+    def ask():
         prompt = (
             "You are an AI assistant. Determine if the following text is a resume/CV. "
             "Reply only with 'YES' or 'NO'.\n\n"
             f"TEXT:\n{text}\n"
         )
-        response = model.generate_content(prompt).text.strip().upper()
+        response = generate(model, prompt, limiter).upper()
         return response.startswith("YES")
+    # The verdict does not depend on the job, so it is shared across roles
+    return cached(cache, cache_key("is_resume", text), ask)
 
-    logging.info("Starting resume matching process")
-    job = state.get("job", {})
-    model = genai.GenerativeModel(GEMINI_MODEL)
-    desc = f"Title: {job.get('title', '')}\nResponsibilities: {job.get('responsibilities', '')}"
-    matches = []
+SCORING_RULES = """SCORING GUIDELINES (0–100):
+- +20 title keywords
+- +30 matched responsibilities
+- +20 matching skills/tools
+- +10 culture-fit language
+- −10 vague or unrelated
+- −10 missing essentials
+"""
 
-    for idx, r in enumerate(state.get("parsed_resumes", [])):
-        logging.info(f"Processing resume {idx+1}/{len(state.get('parsed_resumes', []))} (name: {r.get('name', 'N/A')})")
-        try:
-            # Only process if Gemini says it's a resume
-            if not is_resume(r.get('text', ''), model):
-                logging.info(f"Skipped non-resume document (name: {r.get('name', 'N/A')})")
-                continue
+STATUS_RULES = """Status rules:
+- Shortlisted if score ≥ 70
+- Review Manually if 50–69
+- Not Suitable if < 50
+"""
 
-            prompt = f"""You are an AI resume screener with a deterministic policy.
+def build_score_prompt(desc, text):
+    return f"""You are an AI resume screener with a deterministic policy.
 
 JOB DESCRIPTION
 {desc}
 
 RESUME TEXT
-{r.get('text', '')}
-
-SCORING GUIDELINES (0–100):
-- +20 title keywords
-- +30 matched responsibilities
-- +20 matching skills/tools
-- +10 culture-fit language
-- −10 vague or unrelated
-- −10 missing essentials
+{text}
 
+{SCORING_RULES}
 EVALUATION RULES
 1. Strict and fair.
 2. Deterministic.
 3. Return only JSON: {{ "score": <int>, "status": <str> }}
 
-Status rules:
-- Shortlisted if score ≥ 70
-- Review Manually if 50–69
-- Not Suitable if < 50
-"""
-            raw = model.generate_content(prompt).text.strip()
-            data = extract_first_json(raw)
-            email = extract_email(r.get('text', ''))  # Extract email from resume text
-
-            matches.append({
-                "name": r.get("name", ""),
-                "score": data.get("score", 0),
-                "status": data.get("status", ""),
-                "email": email
-            })
-            logging.info(f"Resume processed (name: {r.get('name', 'N/A')}, score: {data.get('score', 0)}, status: {data.get('status', '')})")
+{STATUS_RULES}"""
+
+def build_batch_prompt(desc, items):
+    resumes = "\n".join(f"RESUME id={rid}\n{text}\n" for rid, text in items)
+    return f"""You are an AI resume screener with a deterministic policy.
+
+JOB DESCRIPTION
+{desc}
+
+Score each resume below independently against the job description.
+
+{resumes}
+{SCORING_RULES}
+EVALUATION RULES
+1. Strict and fair.
+2. Deterministic.
+3. Return only a JSON array with one object per resume:
+   [{{ "id": <id>, "score": <int>, "status": <str> }}]
+
+{STATUS_RULES}"""
+
+def build_multi_role_prompt(descs, text):
+    roles = "\n".join(f"ROLE id={rid}\n{desc}\n" for rid, desc in descs)
+    return f"""You are an AI resume screener with a deterministic policy.
+
+RESUME TEXT
+{text}
+
+Score the resume independently against each job description below.
+
+{roles}
+{SCORING_RULES}
+EVALUATION RULES
+1. Strict and fair.
+2. Deterministic.
+3. Return only a JSON array with one object per role:
+   [{{ "id": <id>, "score": <int>, "status": <str> }}]
+
+{STATUS_RULES}"""
+
+def job_description(job):
+    return f"Title: {job.get('title', '')}\nResponsibilities: {job.get('responsibilities', '')}"
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English prose
+    return len(text) // 4 + 1
+
+def extract_json_array(text):
+    cleaned = re.sub(r"^```(?:json)?\s*|```$", "", text.strip(), flags=re.MULTILINE).strip()
+    match = re.search(r"\[.*\]", cleaned, re.DOTALL)
+    if match:
+        return json.loads(match.group(0))
+    raise ValueError("No JSON array found in response")
+
+def to_match(r, data):
+    logging.info(f"Resume processed (name: {r.get('name', 'N/A')}, score: {data.get('score', 0)}, status: {data.get('status', '')})")
+    return {
+        "name": r.get("name", ""),
+        "file_id": r.get("id"),
+        "score": data.get("score", 0),
+        "status": data.get("status", ""),
+        "email": extract_email(r.get('text', ''))  # Extract email from resume text
+    }
+
+def error_match(r, e):
+    logging.error(f"Error processing resume (name: {r.get('name', 'N/A')}): {e}", exc_info=True)
+    return {
+        "name": r.get("name", ""),
+        "file_id": r.get("id"),
+        "score": 0,
+        "status": f"Error: {type(e).__name__}"
+    }
+
+def request_score(r, desc, model, limiter=None, cache=None):
+    def ask():
+        raw = generate(model, build_score_prompt(desc, prompt_text(r)), limiter)
+        return extract_first_json(raw)
+    return cached(cache, cache_key("score", desc, prompt_text(r)), ask)
+
+def score_resume(idx, total, r, desc, model, limiter=None, cache=None):
+    """
+    Score one parsed resume. Returns the match dict, or None for non-resumes.
+    """
+    logging.info(f"Processing resume {idx+1}/{total} (name: {r.get('name', 'N/A')})")
+    try:
+        # Only process if it is a resume
+        if not is_resume(r.get('text', ''), model, limiter, cache, r.get('condensed')):
+            logging.info(f"Skipped non-resume document (name: {r.get('name', 'N/A')})")
+            return None
+        return to_match(r, request_score(r, desc, model, limiter, cache))
+    except Exception as e:
+        return error_match(r, e)
+
+# Marks a resume that passed screening but still needs a score
+PENDING = object()
+
+def screen_resume(idx, total, r, desc, model, limiter=None, cache=None):
+    """
+    Batched mode, first pass: None for non-resumes, a match when the score is
+    already cached, PENDING otherwise.
+    """
+    logging.info(f"Processing resume {idx+1}/{total} (name: {r.get('name', 'N/A')})")
+    try:
+        if not is_resume(r.get('text', ''), model, limiter, cache, r.get('condensed')):
+            logging.info(f"Skipped non-resume document (name: {r.get('name', 'N/A')})")
+            return None
+        data = cache.get(cache_key("score", desc, prompt_text(r))) if cache is not None else None
+        return to_match(r, data) if data is not None else PENDING
+    except Exception as e:
+        return error_match(r, e)
+
+def pack_batches(indices, resumes, desc, batch_size, token_budget):
+    """
+    Group resume indices into prompts of at most `batch_size` resumes and
+    roughly `token_budget` input tokens, keeping input order.
+    """
+    overhead = estimate_tokens(build_batch_prompt(desc, []))
+    batches, current, used = [], [], overhead
+    for idx in indices:
+        cost = estimate_tokens(prompt_text(resumes[idx])) + 8
+        if current and (len(current) >= batch_size or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(idx)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def score_batch(batch, resumes, desc, model, limiter=None, cache=None):
+    """
+    Score several resumes with one prompt. Returns {index: data} for the
+    entries that came back well formed; the caller retries the rest alone.
+    """
+    if len(batch) == 1:
+        return {}
+    try:
+        raw = generate(model, build_batch_prompt(desc, [(idx, prompt_text(resumes[idx])) for idx in batch]), limiter)
+        items = extract_json_array(raw)
+    except Exception as e:
+        logging.warning(f"Batch of {len(batch)} resumes failed, scoring them individually: {e}")
+        return {}
+
+    scored = {}
+    wanted = set(batch)
+    for idx, data in parse_score_items(items).items():
+        if idx in wanted:
+            scored[idx] = data
+            if cache is not None:
+                cache.set(cache_key("score", desc, prompt_text(resumes[idx])), data)
+    if len(scored) < len(batch):
+        logging.warning(f"Batch returned {len(scored)} of {len(batch)} scores; retrying the rest individually")
+    return scored
+
+def parse_score_items(items):
+    """
+    {id: {"score", "status"}} from a JSON-array answer, skipping malformed entries.
+    """
+    scored = {}
+    for item in items:
+        try:
+            scored[int(item["id"])] = {"score": int(item["score"]), "status": str(item["status"])}
+        except (KeyError, TypeError, ValueError):
+            continue
+    return scored
+
+def score_roles(r, descs, model, limiter=None, cache=None, multi_role=GEMINI_MULTI_ROLE):
+    """
+    Score one resume against several job descriptions. Returns, aligned with
+    `descs`, the score data or the exception raised for that role. With
+    `multi_role`, uncached roles share one prompt; roles missing from its
+    answer are scored on their own.
+    """
+    results = [None] * len(descs)
+    keys = [cache_key("score", desc, prompt_text(r)) for desc in descs]
+    if cache is not None:
+        for i, key in enumerate(keys):
+            results[i] = cache.get(key)
+    pending = [i for i, data in enumerate(results) if data is None]
+
+    if multi_role and len(pending) > 1:
+        try:
+            raw = generate(model, build_multi_role_prompt([(i, descs[i]) for i in pending], prompt_text(r)), limiter)
+            for i, data in parse_score_items(extract_json_array(raw)).items():
+                if i in pending:
+                    results[i] = data
+                    if cache is not None:
+                        cache.set(keys[i], data)
         except Exception as e:
-            logging.error(f"Error processing resume (name: {r.get('name', 'N/A')}): {e}", exc_info=True)
-            matches.append({
-                "name": r.get("name", ""),
-                "score": 0,
-                "status": f"Error: {type(e).__name__}"
-            })
-    logging.info("Resume matching process completed")
-    return {"matches": matches}
\ No newline at end of file
+            logging.warning(f"Multi-role prompt failed for {r.get('name', 'N/A')}, scoring roles individually: {e}")
+
+    for i in pending:
+        if results[i] is None:
+            try:
+                results[i] = request_score(r, descs[i], model, limiter, cache)
+            except Exception as e:
+                results[i] = e
+    return results
+
+def score_resumes(parsed_resumes, job, model, concurrency=GEMINI_CONCURRENCY, limiter=None, cache=verdict_cache,
+                  batch_size=GEMINI_BATCH_SIZE, token_budget=GEMINI_BATCH_TOKEN_BUDGET):
+    """
+    Score resumes on a bounded thread pool. Output keeps the input order.
+    With `batch_size` > 1, resumes that still need a score are packed into
+    multi-resume prompts (within `token_budget`) and any resume missing from
+    a batch answer is scored on its own.
+    """
+    desc = job_description(job)
+    total = len(parsed_resumes)
+    workers = min(concurrency, total)
+
+    def run_all(fn, items):
+        if workers <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini") as pool:
+            return list(pool.map(propagate(fn), items))
+
+    if batch_size <= 1:
+        results = run_all(lambda item: score_resume(item[0], total, item[1], desc, model, limiter, cache),
+                          list(enumerate(parsed_resumes)))
+        return [m for m in results if m is not None]
+
+    results = run_all(lambda item: screen_resume(item[0], total, item[1], desc, model, limiter, cache),
+                      list(enumerate(parsed_resumes)))
+    pending = [idx for idx, m in enumerate(results) if m is PENDING]
+    batches = pack_batches(pending, parsed_resumes, desc, batch_size, token_budget)
+    scored = {}
+    for part in run_all(lambda batch: score_batch(batch, parsed_resumes, desc, model, limiter, cache), batches):
+        scored.update(part)
+    for idx in pending:
+        if idx in scored:
+            results[idx] = to_match(parsed_resumes[idx], scored[idx])
+    retry = [idx for idx in pending if idx not in scored]
+
+    def run_single(idx):
+        r = parsed_resumes[idx]
+        try:
+            return to_match(r, request_score(r, desc, model, limiter, cache))
+        except Exception as e:
+            return error_match(r, e)
+
+    for idx, match in zip(retry, run_all(run_single, retry)):
+        results[idx] = match
+    logging.info(f"Batched scoring: {len(pending)} resumes in {len(batches)} prompts, {len(retry)} scored individually")
+    return [m for m in results if m is not None]
+
+def split_near_duplicates(resumes, job, index=near_duplicates, action=NEAR_DUPLICATE_ACTION):
+    """
+    Partition resumes by whether a near-duplicate was already scored for this
+    job. Returns (resumes to score, in priority order; matches reused from
+    near-duplicates; the resumes that had no near-duplicate).
+    """
+    if action == "off" or index is None:
+        return resumes, [], resumes
+    job_key = cache_key("near_duplicate", job_description(job))
+    fresh, deferred, reused = [], [], []
+    for r in resumes:
+        found = index.find(job_key, r.get('text', ''))
+        if found is None:
+            fresh.append(r)
+            continue
+        verdict, similarity, original = found
+        logging.info(f"Near-duplicate of {original} ({similarity:.2f}): {r.get('name', 'N/A')}")
+        if action == "defer":
+            deferred.append(r)
+        else:
+            reused.append(to_match(r, verdict))
+    return fresh + deferred, reused, fresh
+
+def record_near_duplicates(resumes, job, index=near_duplicates, cache=verdict_cache):
+    """
+    Add newly scored resumes to the near-duplicate index with their verdicts.
+    """
+    if index is None or cache is None:
+        return
+    desc = job_description(job)
+    job_key = cache_key("near_duplicate", desc)
+    for r in resumes:
+        data = cache.get(cache_key("score", desc, prompt_text(r)))
+        if data is not None:
+            index.add(job_key, r.get('text', ''), data, r.get('name', ''))
+
+def match_resumes(state):
+    logging.info("Starting resume matching process")
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    # Score the prefilter's shortlist when it ran; its rejects keep their rows
+    shortlist = state.get("shortlist")
+    if shortlist is None:
+        shortlist = state.get("parsed_resumes", [])
+    job = state.get("job", {})
+    to_score, reused, fresh = split_near_duplicates(shortlist, job)
+    matches = score_resumes(to_score, job, model) + reused + state.get("prefiltered", [])
+    if NEAR_DUPLICATE_ACTION != "off":
+        record_near_duplicates(fresh, job)
+    stats = verdict_cache.snapshot()
+    with verdict_lock:
+        local, llm = verdict_counts["local"], verdict_counts["llm"]
+    logging.info(
+        "Resume matching process completed (LLM cache: %d memory hits, %d persistent hits, %d misses; "
+        "is_resume: %d decided locally, %d sent to Gemini; %d near-duplicate verdicts reused)",
+        stats["memory_hits"], stats["persistent_hits"], stats["misses"], local, llm, len(reused)
+    )
+    return {"matches": matches}
@@ -1,81 +1,252 @@
-import os
-import fitz    # PyMuPDF
-import docx
-import textract
-import spacy
-from services.drive import download_file
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.drive import download_bytes
+from agents.extractors import detect_format, extract_text
+from agents.skills import extract_skills, extract_skills_batch
+from database.cache import TwoTierCache
+from config.settings import (
+    PARSED_CACHE_TTL_SECONDS, PARSED_CACHE_MEMORY_SIZE, PARSED_CACHE_MAX_ENTRIES,
+    PARSE_WORKERS, PARSE_TIMEOUT, MAX_DOCUMENT_BYTES,
+)
 
 import logging
 
-# Setup logging
-log_dir = ".logs"
-os.makedirs(log_dir, exist_ok=True)
-log_path = os.path.join(log_dir, "agents.log")
-logging.basicConfig(
-    filename=log_path,
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-nlp = spacy.load("en_core_web_sm")
+parsed_store = TwoTierCache("parsed_documents", PARSED_CACHE_TTL_SECONDS, PARSED_CACHE_MEMORY_SIZE, PARSED_CACHE_MAX_ENTRIES)
+
+def document_key(file):
+    """
+    Store key for a Drive file, or None when Drive reported no version info.
+    """
+    version = file.get("md5Checksum") or file.get("modifiedTime")
+    return f"{file.get('id')}:{version}" if version else None
+
+def is_supported(file):
+    return detect_format(file.get("name"), mime_type=file.get("mimeType")) is not None
+
+def too_large(file, data=None):
+    """
+    True when the file exceeds MAX_DOCUMENT_BYTES, judged from Drive's size
+    metadata before downloading and from the bytes afterwards.
+    """
+    if MAX_DOCUMENT_BYTES <= 0:
+        return False
+    size = len(data) if data is not None else int(file.get("size") or 0)
+    return size > MAX_DOCUMENT_BYTES
+
+def skills_for(texts, names):
+    """
+    Skills for each text in one batched pass, falling back to one document at
+    a time so a failure is reported against the file that caused it.
+    """
+    try:
+        return extract_skills_batch(texts)
+    except Exception as e:
+        logging.warning("Batched skills extraction failed, retrying per file: %s", e)
+    results = []
+    for text, name in zip(texts, names):
+        try:
+            results.append(extract_skills(text))
+        except Exception as e:
+            logging.error("Error extracting skills from '%s': %s", name, e, exc_info=True)
+            results.append([])
+    return results
+
+def extraction_worker(conn):
+    """
+    Worker process loop: extract each (name, data) received on `conn` and
+    send back (True, text) or (False, exception).
+    """
+    while True:
+        try:
+            item = conn.recv()
+        except (EOFError, OSError):
+            return
+        if item is None:  # shutdown
+            return
+        name, data = item
+        try:
+            reply = (True, extract_text(name, data))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception:  # unpicklable exception from an extractor
+            conn.send((False, RuntimeError(f"{type(reply[1]).__name__}: {reply[1]}")))
+
+
+class ExtractionPool:
+    """
+    Extraction worker processes shared by every caller (role runs, streaming
+    parse threads, work-queue workers). Each worker parses one file at a
+    time, and the time limit runs from when the file is handed to a worker.
+    A worker that overruns it, or dies, is terminated and replaced on its
+    own; files other callers have in flight on the other workers carry on.
+    """
+
+    def __init__(self, workers):
+        self.size = workers
+        self.idle = queue.Queue()
+        for _ in range(workers):
+            self.idle.put(self._spawn())
+
+    @staticmethod
+    def _spawn():
+        conn, child = multiprocessing.Pipe()
+        proc = multiprocessing.Process(target=extraction_worker, args=(child,), daemon=True)
+        proc.start()
+        child.close()
+        return proc, conn
+
+    @staticmethod
+    def _kill(worker):
+        proc, conn = worker
+        proc.terminate()
+        proc.join()
+        conn.close()
+
+    def extract(self, name, data, timeout=PARSE_TIMEOUT):
+        """
+        extract_text(name, data) on a free worker. Raises TimeoutError when
+        parsing takes longer than `timeout` seconds.
+        """
+        worker = self.idle.get()
+        proc, conn = worker
+        healthy = False
+        try:
+            conn.send((name, data))
+            if conn.poll(timeout):
+                ok, value = conn.recv()
+                healthy = True
+            else:
+                error = TimeoutError(f"parsing exceeded {timeout}s")
+        except (EOFError, OSError) as e:
+            # Crashed inside a native extractor
+            error = RuntimeError(f"extraction worker died: {e!r}")
+        finally:
+            if not healthy:
+                self._kill(worker)
+                worker = self._spawn()
+            self.idle.put(worker)
+        if not healthy:
+            raise error
+        if not ok:
+            raise value
+        return value
+
+    def shutdown(self):
+        """
+        Stop the idle workers and wait for them to exit.
+        """
+        while True:
+            try:
+                proc, conn = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            proc.join(5)
+            if proc.is_alive():
+                proc.terminate()
+            conn.close()
+
+pool = None
+pool_lock = threading.Lock()
+
+def get_pool():
+    global pool
+    with pool_lock:
+        if pool is None and PARSE_WORKERS > 0:
+            pool = ExtractionPool(PARSE_WORKERS)
+        return pool
+
+def run_extraction(items, executor, timeout=PARSE_TIMEOUT):
+    """
+    Run extract_text over (name, data) pairs, in-process when `executor` is
+    None, otherwise on the ExtractionPool `executor`. Returns, in input
+    order, the text or the exception raised for that file.
+    """
+    def one(item):
+        try:
+            if executor is None:
+                return extract_text(*item)
+            return executor.extract(*item, timeout=timeout)
+        except Exception as e:
+            return e
+
+    if executor is None or len(items) <= 1:
+        return [one(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(len(items), executor.size), thread_name_prefix="extract") as threads:
+        return list(threads.map(one, items))
 
 def parse_resume(state):
-    os.makedirs("tmp", exist_ok=True)
     parsed = []
 
     logging.info("Starting resume parsing for %d files.", len(state.get("resumes", [])))
 
+    slots = []
+    pending = []
     for file in state.get("resumes", []):
         fid, name = file.get("id"), file.get("name")
-        path = f"tmp/{name}"
+        key = document_key(file)
+        stored = parsed_store.get(key) if key else None
+        if stored is not None:
+            logging.info("Unchanged file, reusing parsed text: %s", name)
+            slots.append({"id": fid, "name": name, "text": stored["text"], "skills": stored["skills"]})
+            continue
+
+        if not is_supported(file):
+            logging.warning("Unsupported file type: %s", name)
+            continue
+        if too_large(file):
+            logging.warning("Skipping oversized file (%s bytes): %s", file.get("size"), name)
+            continue
+
         logging.info("Downloading file: %s", name)
         try:
-            download_file(fid, path)
+            data = download_bytes(fid)
         except Exception as e:
             logging.error("Failed to download file '%s': %s", name, e, exc_info=True)
             continue
+        if too_large(file, data):
+            logging.warning("Skipping oversized file (%d bytes): %s", len(data), name)
+            continue
 
-        text = ""
-        try:
-            if name.endswith(".pdf"):
-                logging.info("Parsing PDF: %s", name)
-                with fitz.open(path) as d:
-                    text = "\n".join(p.get_text() for p in d)
-
-            elif name.endswith(".docx"):
-                logging.info("Parsing DOCX: %s", name)
-                d = docx.Document(path)
-                text = "\n".join(p.text for p in d.paragraphs)
-                for tbl in d.tables:
-                    for row in tbl.rows:
-                        for cell in row.cells:
-                            text += "\n" + cell.text
-
-            elif name.endswith(".doc"):
-                logging.info("Parsing DOC: %s", name)
-                text = textract.process(path).decode("utf-8")
+        slots.append(len(pending))
+        pending.append((fid, name, data, key))
 
-            else:
-                logging.warning("Unsupported file type: %s", name)
-                continue
+    results = run_extraction([(name, data) for _, name, data, _ in pending], get_pool())
+    extracted = [i for i, r in enumerate(results) if not isinstance(r, Exception)]
+    names = [pending[i][1] for i in extracted]
+    skills = dict(zip(extracted, skills_for([results[i] for i in extracted], names)))
 
-        except Exception as e:
-            logging.error("Error parsing file '%s': %s", name, e, exc_info=True)
+    for slot in slots:
+        if isinstance(slot, dict):
+            parsed.append(slot)
+            continue
+        fid, name, _, key = pending[slot]
+        result = results[slot]
+        if isinstance(result, TimeoutError):
+            logging.error("Timed out parsing file '%s': %s", name, result)
+            continue
+        if isinstance(result, Exception):
+            logging.error("Error parsing file '%s': %s", name, result, exc_info=result)
             continue
-
-        try:
-            doc_nlp = nlp(text)
-            skills = [ent.text for ent in doc_nlp.ents if ent.label_ == "SKILL"]
-        except Exception as e:
-            logging.error("Error extracting skills from '%s': %s", name, e, exc_info=True)
-            skills = []
 
         parsed.append({
+            "id": fid,
             "name": name,
-            "text": text,
-            "skills": skills
+            "text": result,
+            "skills": skills[slot]
         })
+        if key:
+            parsed_store.set(key, {"text": result, "skills": skills[slot]})
         logging.info("Finished processing file: %s", name)
 
-    logging.info("Resume parsing completed. Parsed %d files.", len(parsed))
+    stats = parsed_store.snapshot()
+    logging.info("Resume parsing completed. Parsed %d files (store: %d memory hits, %d persistent hits, %d misses).",
+                 len(parsed), stats["memory_hits"], stats["persistent_hits"], stats["misses"])
     return {"parsed_resumes": parsed}
@@ -0,0 +1,73 @@
+import logging
+import threading
+
+import spacy
+from spacy.matcher import PhraseMatcher
+
+from config.settings import (
+    SKILL_NER_MODEL, SKILLS_GAZETTEER, SPACY_BATCH_SIZE, SPACY_N_PROCESS,
+)
+
+# Components the NER-only pass never reads. The shared tok2vec is dropped
+# separately, and only when nothing left listens to it: the stock English
+# pipelines give `ner` its own, but models trained from spaCy's default
+# config feed `ner` through a listener on the shared one.
+UNUSED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+
+nlp = None
+matcher = None
+canonical = {}
+load_lock = threading.Lock()
+
+def load_gazetteer(path=SKILLS_GAZETTEER):
+    with open(path, encoding="utf-8") as fh:
+        return [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+
+def drop_unused_tok2vec(pipeline):
+    if "tok2vec" in pipeline.pipe_names and not pipeline.get_pipe("tok2vec").listening_components:
+        pipeline.remove_pipe("tok2vec")
+    return pipeline
+
+def get_pipeline():
+    """
+    Load the skills pipeline on first use: the NER model named by
+    SKILL_NER_MODEL (trimmed to `ner` and the tok2vec it listens to, if any), or just a tokenizer when unset, plus a
+    PhraseMatcher over the skills gazetteer.
+    """
+    global nlp, matcher
+    with load_lock:
+        if nlp is None:
+            if SKILL_NER_MODEL:
+                pipeline = drop_unused_tok2vec(spacy.load(SKILL_NER_MODEL, exclude=UNUSED_COMPONENTS))
+            else:
+                pipeline = spacy.blank("en")
+            skills = load_gazetteer()
+            phrase_matcher = PhraseMatcher(pipeline.vocab, attr="LOWER")
+            phrase_matcher.add("SKILL", list(pipeline.tokenizer.pipe(skills)))
+            canonical.update((s.lower(), s) for s in skills)
+            logging.info("Loaded skills pipeline (%s) with %d gazetteer entries.",
+                         SKILL_NER_MODEL or "tokenizer only", len(skills))
+            matcher, nlp = phrase_matcher, pipeline
+        return nlp, matcher
+
+def skills_from_doc(doc, phrase_matcher):
+    found = {}
+    for ent in doc.ents:
+        if ent.label_ == "SKILL":
+            found.setdefault(ent.text.lower(), ent.text)
+    for _, start, end in phrase_matcher(doc):
+        span = doc[start:end].text
+        found.setdefault(span.lower(), canonical.get(span.lower(), span))
+    return list(found.values())
+
+def extract_skills_batch(texts, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS):
+    """
+    Skills for each text, in order, using one batched nlp.pipe pass.
+    """
+    pipeline, phrase_matcher = get_pipeline()
+    docs = pipeline.pipe(texts, batch_size=batch_size, n_process=n_process)
+    return [skills_from_doc(doc, phrase_matcher) for doc in docs]
+
+def extract_skills(text):
+    pipeline, phrase_matcher = get_pipeline()
+    return skills_from_doc(pipeline(text), phrase_matcher)
@@ -0,0 +1,74 @@
+"""
+Prompt tokens saved by agents.condenser at several budgets, and optionally
+the score drift it causes. Each JSONL line is one resume:
+
+    {"title": ..., "responsibilities": ..., "name": ..., "text": ...}
+
+    python -m benchmarks.bench_condenser sample.jsonl --budgets 0 1000 2000
+    python -m benchmarks.bench_condenser sample.jsonl --budgets 2000 --score   # calls Gemini
+"""
+import argparse
+import json
+import statistics
+import time
+
+from agents.condenser import condense
+from agents.resume_matcher import estimate_tokens
+
+
+def load_sample(path):
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def score_drift(rows, budget):
+    import google.generativeai as genai
+    from agents.resume_matcher import score_resumes
+    from config.settings import GEMINI_MODEL
+
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    deltas, flips, compared = [], 0, 0
+    for row in rows:
+        job = {"title": row["title"], "responsibilities": row["responsibilities"]}
+        raw = score_resumes([row], job, model, concurrency=1, cache=None)
+        short = score_resumes([{**row, "condensed": condense(row["text"], budget)}], job, model, concurrency=1, cache=None)
+        if raw and short:
+            compared += 1
+            deltas.append(abs(int(raw[0]["score"]) - int(short[0]["score"])))
+            flips += raw[0]["status"] != short[0]["status"]
+    return {
+        "scored": compared,
+        "mean_abs_score_delta": round(statistics.mean(deltas), 2) if deltas else None,
+        "status_changes": flips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sample")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0, 1000, 2000])
+    parser.add_argument("--score", action="store_true", help="score raw and condensed text with Gemini")
+    args = parser.parse_args()
+
+    rows = load_sample(args.sample)
+    before = [estimate_tokens(row["text"]) for row in rows]
+    for budget in args.budgets:
+        start = time.perf_counter()
+        after = [estimate_tokens(condense(row["text"], budget)) for row in rows]
+        elapsed = time.perf_counter() - start
+        report = {
+            "budget": budget,
+            "resumes": len(rows),
+            "tokens_before": sum(before),
+            "tokens_after": sum(after),
+            "reduction": round(1 - sum(after) / sum(before), 4) if sum(before) else None,
+            "max_tokens_after": max(after, default=0),
+            "condense_ms": round(elapsed * 1000, 2),
+        }
+        if args.score:
+            report.update(score_drift(rows, budget))
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
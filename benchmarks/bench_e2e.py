@@ -0,0 +1,291 @@
+"""
+End-to-end throughput of the whole pipeline against in-process fakes: a Drive
+serving a generated corpus of PDF and DOCX resumes, a Sheets keeping the
+Roles and Results tabs in memory, a Gemini model with fixed latency and
+deterministic JSON, and mongomock in place of MongoDB.
+
+Each (entry point, corpus size) pair runs in a fresh interpreter so caches,
+settings and peak RSS do not leak between runs. Entry points:
+
+    graph    build_graph().invoke per role, then store_results
+    sweep    webhook.server.process_all_roles (honours RUN_MODE)
+    webhook  Drive push notification -> work queue -> changes sync, via TestClient
+
+Reports one JSON line per run: throughput, p50/p99 seconds from start until
+a resume's Results row is appended, API call counts and peak RSS.
+
+    python -m benchmarks.bench_e2e --sizes 10 100 1000 --latency 0.05
+    python -m benchmarks.bench_e2e --entries sweep --set RUN_MODE=resume --set GEMINI_MULTI_ROLE=1
+"""
+import argparse
+import io
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import docx
+import fitz    # PyMuPDF
+
+from benchmarks.fakes import FakeDrive, FakeSheets
+from config.logging_setup import setup_logging
+
+ROLES = [
+    ("Data Engineer", "Build batch and streaming data pipelines with Python, SQL, Spark and Airflow"),
+    ("Analytics Engineer", "Model warehouse data with SQL and dbt and maintain reporting pipelines"),
+    ("Platform Engineer", "Run Kubernetes, Terraform and CI/CD for the data platform"),
+]
+
+# Settings every run needs: the fake has no RPM quota, notifications should
+# not be debounced, and checkpoints must not land in the real database
+CHILD_ENV = {
+    "GEMINI_RPM": "0",
+    "WORK_QUEUE_DEBOUNCE_SECONDS": "0",
+    "DRIVE_WEBHOOK_URL": "https://bench.invalid/webhook/drive",
+}
+
+
+def make_pdf(text):
+    with fitz.open() as d:
+        page = d.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=10)
+        return d.tobytes()
+
+def make_docx(text):
+    d = docx.Document()
+    for line in text.splitlines():
+        d.add_paragraph(line)
+    buf = io.BytesIO()
+    d.save(buf)
+    return buf.getvalue()
+
+def make_roles(count):
+    roles = []
+    for i in range(count):
+        title, responsibilities = ROLES[i % len(ROLES)]
+        if i >= len(ROLES):
+            title = f"{title} {i // len(ROLES) + 1}"
+        roles.append({"title": title, "responsibilities": responsibilities, "folder_id": f"folder-{i:03d}"})
+    return roles
+
+def make_corpus(size, roles):
+    """
+    `size` distinct files spread round-robin over the role folders,
+    alternating PDF and DOCX; every tenth is not a resume.
+    """
+    from benchmarks.bench_matcher import RESUME, NOT_A_RESUME
+
+    corpus = []
+    for i in range(size):
+        text = (NOT_A_RESUME if i % 10 == 9 else RESUME).format(i=i, years=i % 12 + 1)
+        if i % 2:
+            name, mime_type, data = f"cv_{i}.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", make_docx(text)
+        else:
+            name, mime_type, data = f"cv_{i}.pdf", "application/pdf", make_pdf(text)
+        corpus.append((roles[i % len(roles)]["folder_id"], name, mime_type, data))
+    return corpus
+
+
+def install_fakes(drive, sheets, latency):
+    """
+    Point the Google clients, Gemini and MongoDB at the fakes. Mongo has to
+    be swapped before any project module creates its client.
+    """
+    import mongomock
+    import pymongo
+    pymongo.MongoClient = mongomock.MongoClient
+
+    import google.generativeai as genai
+    from benchmarks.bench_matcher import StubModel, StubResponse
+
+    class FakeGemini(StubModel):
+        """StubModel that also answers multi-role prompts and counts prompt kinds."""
+
+        def __init__(self, latency):
+            super().__init__(latency)
+            self.kinds = Counter()
+
+        def generate_content(self, prompt):
+            if prompt.startswith("You are an AI assistant. Determine"):
+                kind = "is_resume"
+            elif re.search(r"^ROLE id=", prompt, re.MULTILINE):
+                kind = "multi_role"
+            elif re.search(r"^RESUME id=", prompt, re.MULTILINE):
+                kind = "batch"
+            else:
+                kind = "score"
+            with self.lock:
+                self.kinds[kind] += 1
+            if kind != "multi_role":
+                return super().generate_content(prompt)
+            time.sleep(self.latency)
+            resume = prompt.split("RESUME TEXT\n", 1)[1].split("\n\nScore the resume", 1)[0]
+            ids = re.findall(r"^ROLE id=(\d+)\n(.*?)\n\n", prompt, re.MULTILINE | re.DOTALL)
+            return StubResponse(json.dumps([{"id": int(i), **self.score(resume + desc)} for i, desc in ids]))
+
+    model = FakeGemini(latency)
+    genai.GenerativeModel = lambda *args, **kwargs: model
+
+    from services import drive as drive_service, sheets as sheets_service
+    drive_service.get_service = lambda api, version: drive
+    sheets_service.get_service = lambda api, version: sheets
+    return model
+
+
+def run_graph(roles):
+    from workflows.recruitment_graph import build_graph
+    from workflows.batch_runner import initial_state
+    from database.mongo import store_results
+
+    graph = build_graph()
+    for role in roles:
+        values = graph.invoke(initial_state(role))
+        if not values.get("stored"):
+            store_results(role["title"], values.get("matches", []))
+
+def run_sweep(roles):
+    from webhook import server
+
+    server.process_all_roles()
+
+def run_webhook(drive, corpus, timeout):
+    """
+    Start the app, upload the corpus and send one Drive notification; returns
+    the notification time once the queue has handled it and is idle.
+    """
+    from fastapi.testclient import TestClient
+    from webhook import server
+
+    with TestClient(server.app) as client:
+        # A running server already has a changes token, so only new uploads sync
+        folders = [role["folder_id"] for role in server.role_registry.roles()]
+        server.change_tracker.commit(server.change_tracker.start_token(), folders)
+        for item in corpus:
+            drive.upload(*item)
+        channel_id = next(iter(server.channel_manager.channels))
+        start = time.perf_counter()
+        client.post("/webhook/drive", headers={
+            "X-Goog-Channel-Id": channel_id,
+            "X-Goog-Resource-State": "add",
+            "X-Goog-Resource-Id": f"resource-{corpus[0][0]}",
+            "X-Goog-Message-Number": "1",
+        })
+        while time.perf_counter() - start < timeout:
+            stats = client.get("/queue").json()
+            # Failed folders are logged, not counted, so compare rows_written with the corpus
+            if stats["processed"] + stats["failed"] and not stats["depth"] and not stats["in_flight"]:
+                break
+            time.sleep(0.05)
+        else:
+            raise TimeoutError(f"queue not drained after {timeout}s")
+    return start
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def mongo_calls():
+    from services.metrics import registry
+
+    calls = Counter()
+    with registry.lock:
+        for (name, labels), hist in registry.histograms.items():
+            labels = dict(labels)
+            if name == "recruitment_external_call_seconds" and labels.get("api") == "mongo":
+                calls[labels["operation"]] += hist["count"]
+    return dict(calls)
+
+def peak_rss_mb(who):
+    # ru_maxrss is in KiB on Linux (bytes on macOS)
+    divisor = 1 << 20 if sys.platform == "darwin" else 1 << 10
+    return round(resource.getrusage(who).ru_maxrss / divisor, 1)
+
+def child(args):
+    setup_logging("bench.log")
+    roles = make_roles(args.roles)
+    drive = FakeDrive(args.drive_latency)
+    sheets = FakeSheets(args.sheets_latency, roles)
+    model = install_fakes(drive, sheets, args.latency)
+    corpus = make_corpus(args.size, roles)
+    setup_rss = peak_rss_mb(resource.RUSAGE_SELF)
+
+    if args.child == "webhook":
+        start = run_webhook(drive, corpus, args.timeout)
+    else:
+        for item in corpus:
+            drive.upload(*item)
+        start = time.perf_counter()
+        (run_graph if args.child == "graph" else run_sweep)(roles)
+    seconds = time.perf_counter() - start
+
+    from agents import resume_parser
+    if resume_parser.pool is not None:
+        resume_parser.pool.shutdown()  # so RUSAGE_CHILDREN covers the parse workers
+
+    latencies = [at - start for at in sheets.appended.values()]
+    print(json.dumps({
+        "entry": args.child,
+        "resumes": args.size,
+        "roles": args.roles,
+        "settings": dict(s.split("=", 1) for s in args.set),
+        "seconds": round(seconds, 3),
+        "resumes_per_sec": round(args.size / seconds, 2),
+        "rows_written": len(sheets.appended),
+        "latency_p50": round(percentile(latencies, 50) or 0, 3),
+        "latency_p99": round(percentile(latencies, 99) or 0, 3),
+        "api_calls": {
+            "drive": dict(drive.calls),
+            "sheets": dict(sheets.calls),
+            "gemini": dict(model.kinds),
+            "mongo": mongo_calls(),
+        },
+        "setup_rss_mb": setup_rss,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_parse_worker_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", nargs="+", default=["graph", "sweep", "webhook"],
+                        choices=["graph", "sweep", "webhook"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--roles", type=int, default=2, help="role folders the corpus is spread over")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per Gemini call")
+    parser.add_argument("--drive-latency", type=float, default=0.005, help="seconds per Drive request")
+    parser.add_argument("--sheets-latency", type=float, default=0.02, help="seconds per Sheets request")
+    parser.add_argument("--timeout", type=float, default=1800, help="webhook entry: seconds to wait for the queue")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="setting override for the runs, e.g. RUN_MODE=resume (repeatable)")
+    parser.add_argument("--child", choices=["graph", "sweep", "webhook"], help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for entry in args.entries:
+            for size in args.sizes:
+                env = {**os.environ, **CHILD_ENV, "CHECKPOINT_DB": os.path.join(tmp, f"{entry}-{size}.sqlite")}
+                env.update(s.split("=", 1) for s in args.set)
+                cmd = [sys.executable, "-m", "benchmarks.bench_e2e", "--child", entry, "--size", str(size)]
+                for flag in ("roles", "latency", "drive_latency", "sheets_latency", "timeout"):
+                    cmd += [f"--{flag.replace('_', '-')}", str(getattr(args, flag))]
+                for setting in args.set:
+                    cmd += ["--set", setting]
+                if subprocess.run(cmd, env=env).returncode:
+                    print(json.dumps({"entry": entry, "resumes": size, "error": "run failed, see .logs/"}), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Throughput of agents.resume_matcher.score_resumes against a stub Gemini model.
+
+score_resumes' `concurrency` is also capped by the shared Gemini policy
+(GEMINI_CONCURRENCY); the benchmark raises that cap to the largest
+--concurrency so each run measures the concurrency it reports.
+
+    python -m benchmarks.bench_matcher --resumes 100 --latency 0.2
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+
+from agents.resume_matcher import score_resumes
+from services.rate_limit import TokenBucket
+from services.resilience import ResiliencePolicy, policies
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Sleeps like a network call and answers deterministically."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+        if prompt.startswith("You are an AI assistant. Determine"):
+            return StubResponse("NO" if "not a resume" in prompt else "YES")
+        resumes = re.findall(r"^RESUME id=(\d+)\n(.*?)\n\n", prompt, re.MULTILINE | re.DOTALL)
+        if resumes:
+            return StubResponse(json.dumps([{"id": int(i), **self.score(text)} for i, text in resumes]))
+        return StubResponse(json.dumps(self.score(prompt)))
+
+    @staticmethod
+    def score(text):
+        score = int(hashlib.md5(text.encode()).hexdigest(), 16) % 101
+        status = "Shortlisted" if score >= 70 else "Review Manually" if score >= 50 else "Not Suitable"
+        return {"score": score, "status": status}
+
+
+RESUME = """Candidate {i}
+candidate{i}@example.com | +1 555 010 {i:04d}
+SUMMARY
+Data engineer with {years} years of experience building batch and streaming pipelines.
+EXPERIENCE
+Acme Corp, Data Engineer  Jan 2019 - Present
+Built Airflow and Spark pipelines feeding the analytics warehouse.
+EDUCATION
+BSc Computer Science, 2012 - 2016
+SKILLS
+Python, SQL, Spark, Airflow
+"""
+
+# Every tenth document is not a resume; the local classifier rejects it
+NOT_A_RESUME = "INVOICE {i}\nAmount due: $500. Terms and conditions apply. " + "lorem ipsum " * 40
+
+
+def make_resumes(n):
+    return [
+        {
+            "name": f"cv_{i}.pdf",
+            "text": (NOT_A_RESUME if i % 10 == 9 else RESUME).format(i=i, years=i % 12 + 1),
+            "skills": [],
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--batch-size", type=int, default=1, help="resumes per scoring prompt")
+    args = parser.parse_args()
+
+    job = {"title": "Data Engineer", "responsibilities": "Build pipelines"}
+    resumes = make_resumes(args.resumes)
+    model = StubModel(args.latency)
+    unlimited = TokenBucket(0)
+    policies["gemini"] = ResiliencePolicy("gemini", max(args.concurrency))
+
+    baseline = None
+    for concurrency in args.concurrency:
+        model.calls = 0
+        start = time.perf_counter()
+        matches = score_resumes(resumes, job, model, concurrency=concurrency, limiter=unlimited, cache=None,
+                                batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = matches
+        print(json.dumps({
+            "concurrency": concurrency,
+            "policy_limit": int(policies["gemini"].limiter.limit),
+            "seconds": round(elapsed, 3),
+            "resumes_per_sec": round(len(resumes) / elapsed, 2),
+            "model_calls": model.calls,
+            "identical_to_first": matches == baseline,
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Extraction throughput of agents.resume_parser over a local corpus of
+PDF/DOCX/DOC files, for several worker-pool sizes, and per-format
+in-process throughput of each registered extractor.
+
+    python -m benchmarks.bench_parser path/to/corpus --workers 0 1 2 4 8
+    python -m benchmarks.bench_parser path/to/corpus --by-format --repeat 5
+"""
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+
+from agents.extractors import detect_format
+from agents.resume_parser import ExtractionPool, run_extraction
+
+
+def load_corpus(path):
+    items = []
+    for name in sorted(os.listdir(path)):
+        if detect_format(name):
+            with open(os.path.join(path, name), "rb") as fh:
+                items.append((name, fh.read()))
+    return items
+
+
+def by_format(items):
+    groups = defaultdict(list)
+    for name, data in items:
+        groups[detect_format(name, data)].append((name, data))
+    for kind, group in sorted(groups.items()):
+        start = time.perf_counter()
+        results = run_extraction(group, None)
+        elapsed = time.perf_counter() - start
+        megabytes = sum(len(data) for _, data in group) / 1e6
+        print(json.dumps({
+            "format": kind,
+            "files": len(group),
+            "failures": sum(isinstance(r, Exception) for r in results),
+            "seconds": round(elapsed, 3),
+            "files_per_sec": round(len(group) / elapsed, 2),
+            "mb_per_sec": round(megabytes / elapsed, 2),
+            "chars": sum(len(r) for r in results if not isinstance(r, Exception)),
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=1, help="replicate the corpus N times")
+    parser.add_argument("--by-format", action="store_true", help="per-format in-process throughput instead")
+    args = parser.parse_args()
+
+    items = load_corpus(args.corpus) * args.repeat
+    if not items:
+        raise SystemExit(f"No supported files in {args.corpus}")
+    if args.by_format:
+        by_format(items)
+        return
+
+    baseline = None
+    for workers in args.workers:
+        # Workers start in the constructor, so start-up is not timed
+        executor = ExtractionPool(workers) if workers > 0 else None
+        start = time.perf_counter()
+        results = run_extraction(items, executor)
+        elapsed = time.perf_counter() - start
+        if executor:
+            executor.shutdown()
+
+        failures = sum(isinstance(r, Exception) for r in results)
+        if baseline is None:
+            baseline = elapsed
+        print(json.dumps({
+            "workers": workers,
+            "files": len(items),
+            "failures": failures,
+            "seconds": round(elapsed, 3),
+            "files_per_sec": round(len(items) / elapsed, 2),
+            "speedup": round(baseline / elapsed, 2),
+        }))
+
+
+if __name__ == "__main__":
+    main()
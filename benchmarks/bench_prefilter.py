@@ -0,0 +1,64 @@
+"""
+LLM calls saved by agents.prefilter versus shortlist damage, on a labelled
+sample. Each JSONL line is one resume scored by the full LLM path:
+
+    {"title": ..., "responsibilities": ..., "name": ..., "text": ..., "status": "Shortlisted"}
+
+    python -m benchmarks.bench_prefilter sample.jsonl --thresholds 0 0.02 0.05 0.1 --top-k 0 50
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+
+from agents.prefilter import shortlist
+
+# Statuses a recruiter would look at; losing one of these is a regression
+KEEP_STATUSES = ("Shortlisted", "Review Manually")
+
+
+def load_sample(path):
+    jobs = defaultdict(list)
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                row = json.loads(line)
+                jobs[(row["title"], row["responsibilities"])].append(row)
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sample")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.0, 0.02, 0.05, 0.1])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[0])
+    args = parser.parse_args()
+
+    jobs = load_sample(args.sample)
+    total = sum(len(rows) for rows in jobs.values())
+    relevant = sum(1 for rows in jobs.values() for r in rows if r["status"] in KEEP_STATUSES)
+
+    for threshold in args.thresholds:
+        for top_k in args.top_k:
+            kept = lost = 0
+            start = time.perf_counter()
+            for (title, responsibilities), rows in jobs.items():
+                keep, _ = shortlist([r["text"] for r in rows], f"{title}\n{responsibilities}", threshold, top_k)
+                keep = set(keep)
+                kept += len(keep)
+                lost += sum(1 for i, r in enumerate(rows) if i not in keep and r["status"] in KEEP_STATUSES)
+            elapsed = time.perf_counter() - start
+            print(json.dumps({
+                "threshold": threshold,
+                "top_k": top_k,
+                "resumes": total,
+                "sent_to_llm": kept,
+                "llm_calls_saved": 2 * (total - kept),
+                "relevant_lost": lost,
+                "relevant_recall": round(1 - lost / relevant, 4) if relevant else None,
+                "prefilter_ms": round(elapsed * 1000, 2),
+            }))
+
+
+if __name__ == "__main__":
+    main()
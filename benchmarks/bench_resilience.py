@@ -0,0 +1,113 @@
+"""
+Throughput of services.resilience against a fault-injecting stub API that
+allows `capacity` concurrent calls, answers 429 (with Retry-After) beyond
+that and fails a fraction of calls with 503, compared with calling it bare.
+
+    python -m benchmarks.bench_resilience --calls 400 --threads 32 --capacity 6 --error-rate 0.05
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.resilience import CircuitBreaker, ResiliencePolicy
+
+
+class StubResponse(dict):
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+class StubHttpError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"stub HTTP {status}")
+        self.resp = StubResponse(status, headers)
+
+
+class FaultyAPI:
+    def __init__(self, capacity, latency, error_rate, retry_after, seed=0):
+        self.capacity = capacity
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "429": 0, "503": 0}
+
+    def call(self):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.in_flight += 1
+            over = self.in_flight > self.capacity
+            fail = self.random.random() < self.error_rate
+        try:
+            if over:
+                self.counts["429"] += 1
+                raise StubHttpError(429, {"retry-after": str(self.retry_after)})
+            time.sleep(self.latency)
+            if fail:
+                self.counts["503"] += 1
+                raise StubHttpError(503)
+            with self.lock:
+                self.counts["ok"] += 1
+            return "ok"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def run(calls, threads, fn):
+    def one(_):
+        try:
+            fn()
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        succeeded = sum(pool.map(one, range(calls)))
+    return succeeded, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--capacity", type=int, default=6, help="concurrent calls the stub accepts")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="fraction of calls failing with 503")
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)  # one retry warning per attempt otherwise
+
+    for mode in ("bare", "resilient"):
+        api = FaultyAPI(args.capacity, args.latency, args.error_rate, args.retry_after)
+        policy = None
+        fn = api.call
+        if mode == "resilient":
+            policy = ResiliencePolicy("stub", args.threads, attempts=8, base=0.01, cap=1.0,
+                                      breaker=CircuitBreaker(threshold=50, reset_seconds=0.5))
+            fn = lambda: policy.call(api.call)
+        succeeded, seconds = run(args.calls, args.threads, fn)
+        report = {
+            "mode": mode,
+            "calls": args.calls,
+            "succeeded": succeeded,
+            "failed": args.calls - succeeded,
+            "seconds": round(seconds, 3),
+            "successes_per_sec": round(succeeded / seconds, 1),
+            "stub": api.counts,
+        }
+        if policy:
+            report["policy"] = policy.snapshot()
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
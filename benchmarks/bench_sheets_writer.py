@@ -0,0 +1,118 @@
+"""
+Checks services.sheets.write_results_to_results_tab against the per-match
+writer it replaced, on randomised Results tabs held by a fake Sheets
+service, and compares the API calls each needs.
+
+The old writer read the tab once per call and deleted by index, so its
+indices went stale after the first deletion; it is run once per match here,
+which is what it meant to do. Matches within one call have distinct emails,
+as one folder run produces; for repeated emails the old writer kept only the
+last row and the new one keeps them all.
+
+    python -m benchmarks.bench_sheets_writer --trials 500 --rows 200 --matches 50
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+
+from benchmarks.fakes import FakeSheets
+from services import sheets as sheets_service
+
+TITLES = ["Data Engineer", "data engineer ", "Analytics Engineer", "ML Engineer"]
+
+
+def legacy_write(service, job_title, matches):
+    """
+    The replaced writer: one metadata read, one batchUpdate per duplicate row
+    and one append per match.
+    """
+    sheet = service.spreadsheets()
+    values = sheet.values().get(spreadsheetId="bench", range="Results!A1:E").execute().get("values", [])[1:]
+    spreadsheet = sheet.get(spreadsheetId="bench").execute()
+    sheet_id = next(s["properties"]["sheetId"] for s in spreadsheet["sheets"] if s["properties"]["title"] == "Results")
+    for match in matches:
+        email = match.get("email", "").strip().lower()
+        jt = job_title.strip().lower()
+        rows_to_delete = []
+        for idx, row in enumerate(values):
+            row_email = row[3].strip().lower() if len(row) > 3 else ""
+            row_jt = row[4].strip().lower() if len(row) > 4 else ""
+            if row_email == email and row_jt == jt:
+                rows_to_delete.append(idx + 2)
+        for row_idx in reversed(rows_to_delete):
+            sheet.batchUpdate(spreadsheetId="bench", body={"requests": [{"deleteDimension": {"range": {
+                "sheetId": sheet_id, "dimension": "ROWS", "startIndex": row_idx - 1, "endIndex": row_idx,
+            }}}]}).execute()
+        sheet.values().append(
+            spreadsheetId="bench", range="Results!A:E", valueInputOption="RAW",
+            body={"values": [[match["name"], match["score"], match.get("status", ""), email, job_title]]},
+        ).execute()
+
+
+def random_case(rng, rows, matches, emails):
+    pool = [f"candidate{i}@example.com" for i in range(emails)] + [""]
+    # Some existing emails differ only in case, which the writers ignore
+    tab = [[f"old {i}", rng.randint(0, 100), "Review Manually", rng.choice(pool), rng.choice(TITLES)] for i in range(rows)]
+    for row in rng.sample(tab, rows // 10):
+        row[3] = row[3].upper()
+    picked = rng.sample(pool, min(matches, len(pool)))
+    new = [{"name": f"new {i}", "score": rng.randint(0, 100), "status": "Shortlisted", "email": email}
+           for i, email in enumerate(picked)]
+    return tab, rng.choice(TITLES), new
+
+
+def run(writer, tab, job_title, matches):
+    fake = FakeSheets()
+    fake.tabs["Results"].extend([list(row) for row in tab])
+    start = time.perf_counter()
+    writer(fake, job_title, matches)
+    return fake.tabs["Results"], fake.calls, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=200, help="existing Results rows per trial")
+    parser.add_argument("--matches", type=int, default=50, help="matches written per trial")
+    parser.add_argument("--emails", type=int, default=80, help="distinct candidate emails")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    def current_write(fake, job_title, matches):
+        sheets_service.get_service = lambda api, version: fake
+        sheets_service.write_results_to_results_tab(job_title, matches)
+
+    rng = random.Random(args.seed)
+    mismatches = 0
+    totals = {"legacy": [Counter(), 0.0], "current": [Counter(), 0.0]}
+    for _ in range(args.trials):
+        tab, job_title, matches = random_case(rng, args.rows, args.matches, args.emails)
+        legacy_rows, legacy_calls, legacy_seconds = [None] + tab, Counter(), 0.0
+        for match in matches:
+            legacy_rows, calls, seconds = run(legacy_write, legacy_rows[1:], job_title, [match])
+            legacy_calls += calls
+            legacy_seconds += seconds
+        current_rows, current_calls, current_seconds = run(current_write, tab, job_title, matches)
+        mismatches += legacy_rows != current_rows
+        totals["legacy"][0] += legacy_calls
+        totals["legacy"][1] += legacy_seconds
+        totals["current"][0] += current_calls
+        totals["current"][1] += current_seconds
+
+    for name, (calls, seconds) in totals.items():
+        print(json.dumps({
+            "writer": name,
+            "trials": args.trials,
+            "api_calls_per_trial": round(sum(calls.values()) / args.trials, 1),
+            "calls": dict(calls),
+            "seconds": round(seconds, 3),
+        }))
+    print(json.dumps({"identical_contents": args.trials - mismatches, "mismatches": mismatches}))
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+In-process stand-ins for the Drive and Sheets discovery clients, shared by
+the benchmarks and tests.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+
+
+class FakeAPI:
+    """Counts requests per method and sleeps like a round trip."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, method_id):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls[method_id] += 1
+
+
+class FakeRequest:
+    """Stands in for googleapiclient's HttpRequest: `execute()` and `methodId`."""
+
+    def __init__(self, api, method_id, run):
+        self.api = api
+        self.methodId = method_id
+        self.run = run
+
+    def execute(self):
+        self.api.record(self.methodId)
+        return self.run()
+
+
+class FakeHttpResponse(dict):
+    def __init__(self, status, headers):
+        super().__init__(headers)
+        self.status = status
+
+
+class FakeMediaRequest:
+    # MediaIoBaseDownload only reads http, uri and headers off the request
+    def __init__(self, drive, file_id):
+        self.http = drive
+        self.uri = file_id
+        self.headers = {}
+
+
+class FakeDrive(FakeAPI):
+    """
+    files().list/get_media/watch, changes() and channels().stop over an
+    in-memory store. Media downloads go through the real MediaIoBaseDownload,
+    with this object as its transport, so chunking is exercised as well.
+    Listing a folder in `unlistable` fails.
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.store = {}
+        self.log = []
+        self.unlistable = set()
+
+    def upload(self, folder_id, name, mime_type, data):
+        file_id = f"file-{len(self.store):06d}"
+        meta = {
+            "id": file_id,
+            "name": name,
+            "mimeType": mime_type,
+            "md5Checksum": hashlib.md5(data).hexdigest(),
+            "modifiedTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "size": str(len(data)),
+            "parents": [folder_id],
+            "trashed": False,
+        }
+        with self.lock:
+            self.store[file_id] = (meta, data)
+            self.log.append({"fileId": file_id, "removed": False, "file": meta})
+
+    def files(self):
+        return FakeDriveFiles(self)
+
+    def changes(self):
+        return FakeDriveChanges(self)
+
+    def channels(self):
+        return FakeDriveChannels(self)
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        self.record("drive.files.get_media")
+        _, data = self.store[uri]
+        first, last = map(int, re.match(r"bytes=(\d+)-(\d+)", headers["range"]).groups())
+        chunk = data[first:last + 1]
+        return FakeHttpResponse(206, {"content-range": f"bytes {first}-{first + len(chunk) - 1}/{len(data)}"}), chunk
+
+
+class FakeDriveFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q, pageSize=100, pageToken=None, **kwargs):
+        folder_id = re.search(r"'([^']+)' in parents", q).group(1)
+
+        def run():
+            if folder_id in self.drive.unlistable:
+                raise RuntimeError(f"cannot list folder {folder_id}")
+            with self.drive.lock:
+                files = [meta for meta, _ in self.drive.store.values() if folder_id in meta["parents"]]
+            start = int(pageToken or 0)
+            response = {"files": [dict(meta) for meta in files[start:start + pageSize]]}
+            if start + pageSize < len(files):
+                response["nextPageToken"] = str(start + pageSize)
+            return response
+        return FakeRequest(self.drive, "drive.files.list", run)
+
+    def get_media(self, fileId):
+        return FakeMediaRequest(self.drive, fileId)
+
+    def watch(self, fileId, body):
+        return FakeRequest(self.drive, "drive.files.watch", lambda: {
+            "id": body["id"],
+            "resourceId": f"resource-{fileId}",
+            "expiration": str(body["expiration"]),
+        })
+
+
+class FakeDriveChanges:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self):
+        return FakeRequest(self.drive, "drive.changes.getStartPageToken",
+                           lambda: {"startPageToken": str(len(self.drive.log))})
+
+    def list(self, pageToken, pageSize=100, **kwargs):
+        def run():
+            with self.drive.lock:
+                log = list(self.drive.log)
+            start = int(pageToken)
+            response = {"changes": log[start:start + pageSize]}
+            if start + pageSize < len(log):
+                response["nextPageToken"] = str(start + pageSize)
+            else:
+                response["newStartPageToken"] = str(len(log))
+            return response
+        return FakeRequest(self.drive, "drive.changes.list", run)
+
+
+class FakeDriveChannels:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def stop(self, body):
+        return FakeRequest(self.drive, "drive.channels.stop", lambda: {})
+
+
+class FakeSheets(FakeAPI):
+    """
+    spreadsheets().get/batchUpdate and values().get/append over in-memory
+    tabs. Records when each Results row was appended, keyed by its name.
+    """
+
+    def __init__(self, latency=0.0, roles=()):
+        super().__init__(latency)
+        self.tabs = {
+            "Roles": [["Title", "Responsibilities", "Folder ID"]] + [[r["title"], r["responsibilities"], r["folder_id"]] for r in roles],
+            "Results": [["Name", "Score", "Status", "Email", "Job Title"]],
+        }
+        self.sheet_ids = {title: i for i, title in enumerate(self.tabs)}
+        self.appended = {}
+
+    def spreadsheets(self):
+        return FakeSpreadsheets(self)
+
+
+class FakeSpreadsheets:
+    def __init__(self, sheets):
+        self.sheets = sheets
+
+    def values(self):
+        return FakeValues(self.sheets)
+
+    def get(self, spreadsheetId, fields=None):
+        return FakeRequest(self.sheets, "sheets.spreadsheets.get", lambda: {
+            "sheets": [{"properties": {"title": title, "sheetId": sheet_id}}
+                       for title, sheet_id in self.sheets.sheet_ids.items()],
+        })
+
+    def batchUpdate(self, spreadsheetId, body):
+        def run():
+            titles = {sheet_id: title for title, sheet_id in self.sheets.sheet_ids.items()}
+            with self.sheets.lock:
+                for request in body["requests"]:
+                    rng = request["deleteDimension"]["range"]
+                    del self.sheets.tabs[titles[rng["sheetId"]]][rng["startIndex"]:rng["endIndex"]]
+            return {}
+        return FakeRequest(self.sheets, "sheets.spreadsheets.batchUpdate", run)
+
+
+class FakeValues:
+    def __init__(self, sheets):
+        self.sheets = sheets
+
+    @staticmethod
+    def parse_range(a1):
+        tab, first = re.match(r"(\w+)!A(\d*)", a1).groups()
+        return tab, int(first or 1) - 1
+
+    def get(self, spreadsheetId, range):
+        def run():
+            tab, first = self.parse_range(range)
+            with self.sheets.lock:
+                return {"values": [list(row) for row in self.sheets.tabs[tab][first:]]}
+        return FakeRequest(self.sheets, "sheets.spreadsheets.values.get", run)
+
+    def append(self, spreadsheetId, range, valueInputOption, body):
+        def run():
+            tab, _ = self.parse_range(range)
+            now = time.perf_counter()
+            with self.sheets.lock:
+                self.sheets.tabs[tab].extend(body["values"])
+                for row in body["values"]:
+                    self.sheets.appended.setdefault(row[0], now)
+            return {}
+        return FakeRequest(self.sheets, "sheets.spreadsheets.values.append", run)
@@ -0,0 +1,17 @@
+import logging
+import os
+
+LOG_DIR = ".logs"
+
+def setup_logging(filename):
+    """
+    Send INFO and above to `.logs/<filename>`. Called once by each entry
+    point (main.py, the webhook server); library modules only log.
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(LOG_DIR, filename),
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
@@ -1,3 +1,5 @@
+import os
+
 GOOGLE_SHEET_ID      = '13lLolICzI9dL2fdFMFx00VFvASXjQmrpqDqylzYYPSQ'
 SCOPES               = [
     'https://www.googleapis.com/auth/drive',
@@ -5,3 +7,123 @@ SCOPES               = [
 ]
 CREDENTIALS_FILE     = 'industrious-eye-461921-r0-d1f535b5aeb5.json'
 GEMINI_MODEL         = 'models/gemini-1.5-pro-latest'
+
+# Gemini throughput: parallel in-flight requests, requests-per-minute quota
+# (0 disables the limiter) and how many requests may burst at once.
+GEMINI_CONCURRENCY   = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+GEMINI_RPM           = int(os.getenv("GEMINI_RPM", "60"))
+GEMINI_BURST         = int(os.getenv("GEMINI_BURST", str(GEMINI_CONCURRENCY)))
+
+# Verdict cache for is_resume/score calls: lifetime, in-process LRU size and
+# the cap on documents kept in the Mongo collection.
+LLM_CACHE_TTL_SECONDS   = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MEMORY_SIZE   = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "10000"))
+LLM_CACHE_MAX_ENTRIES   = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200000"))
+
+# Parsed-document store keyed by Drive file id + checksum.
+PARSED_CACHE_TTL_SECONDS = int(os.getenv("PARSED_CACHE_TTL_SECONDS", str(90 * 24 * 3600)))
+PARSED_CACHE_MEMORY_SIZE = int(os.getenv("PARSED_CACHE_MEMORY_SIZE", "2000"))
+PARSED_CACHE_MAX_ENTRIES = int(os.getenv("PARSED_CACHE_MAX_ENTRIES", "100000"))
+
+# Drive downloads are streamed into memory in chunks of this many bytes.
+DRIVE_CHUNK_SIZE     = int(os.getenv("DRIVE_CHUNK_SIZE", str(1024 * 1024)))
+
+# Document extraction pool: worker processes (0 parses in-process) and the
+# per-file time limit in seconds.
+PARSE_WORKERS        = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+PARSE_TIMEOUT        = float(os.getenv("PARSE_TIMEOUT", "60"))
+
+# Skills extraction: spaCy model whose NER emits SKILL entities (empty uses the
+# gazetteer matcher alone), gazetteer path and nlp.pipe batching.
+SKILL_NER_MODEL      = os.getenv("SKILL_NER_MODEL", "")
+SKILLS_GAZETTEER     = os.getenv("SKILLS_GAZETTEER", os.path.join(os.path.dirname(__file__), "skills.txt"))
+SPACY_BATCH_SIZE     = int(os.getenv("SPACY_BATCH_SIZE", "64"))
+SPACY_N_PROCESS      = int(os.getenv("SPACY_N_PROCESS", "1"))
+
+# Socket timeout (seconds) for the shared Google API transports.
+GOOGLE_HTTP_TIMEOUT  = int(os.getenv("GOOGLE_HTTP_TIMEOUT", "60"))
+
+# Webhook work queue: worker threads, how long Drive notifications for one
+# folder are coalesced, how many processed (file id, checksum) pairs are
+# remembered, and how many syncs a file that keeps failing (download, parse
+# timeout, Gemini error) is retried before it is given up on.
+WORK_QUEUE_WORKERS          = int(os.getenv("WORK_QUEUE_WORKERS", "2"))
+WORK_QUEUE_DEBOUNCE_SECONDS = float(os.getenv("WORK_QUEUE_DEBOUNCE_SECONDS", "5"))
+PROCESSED_FILES_MAX         = int(os.getenv("PROCESSED_FILES_MAX", "50000"))
+FILE_MAX_ATTEMPTS           = int(os.getenv("FILE_MAX_ATTEMPTS", "3"))
+
+# How long the Roles tab snapshot is reused before Sheets is read again.
+ROLE_CACHE_TTL_SECONDS = float(os.getenv("ROLE_CACHE_TTL_SECONDS", "300"))
+
+# Drive watch channels: requested lifetime (Drive caps file watches at one
+# day) and how long before expiry a channel is renewed.
+DRIVE_CHANNEL_TTL_SECONDS          = int(os.getenv("DRIVE_CHANNEL_TTL_SECONDS", str(24 * 3600)))
+DRIVE_CHANNEL_RENEW_BEFORE_SECONDS = int(os.getenv("DRIVE_CHANNEL_RENEW_BEFORE_SECONDS", "900"))
+
+# Batch runs (main.py): roles processed at once and the LangGraph
+# checkpoint database that lets an interrupted run resume.
+ROLE_PARALLELISM     = int(os.getenv("ROLE_PARALLELISM", "4"))
+CHECKPOINT_DB        = os.getenv("CHECKPOINT_DB", ".checkpoints/runs.sqlite")
+
+# Local TF-IDF prefilter ahead of Gemini: minimum cosine similarity to the
+# job, cap on shortlisted resumes (0 = no cap) and hashed feature buckets.
+# The Roles tab can override the first two per role (columns D and E). The
+# streaming pipeline applies the threshold per micro-batch and ignores top-K.
+PREFILTER_THRESHOLD  = float(os.getenv("PREFILTER_THRESHOLD", "0.02"))
+PREFILTER_TOP_K      = int(os.getenv("PREFILTER_TOP_K", "0"))
+PREFILTER_FEATURES   = int(os.getenv("PREFILTER_FEATURES", str(2 ** 18)))
+
+# Local resume/non-resume classifier: probabilities at or above ACCEPT (or at
+# or below REJECT) are trusted; anything in between still asks Gemini.
+RESUME_CLASSIFIER_ACCEPT = float(os.getenv("RESUME_CLASSIFIER_ACCEPT", "0.9"))
+RESUME_CLASSIFIER_REJECT = float(os.getenv("RESUME_CLASSIFIER_REJECT", "0.1"))
+
+# Batched scoring: resumes packed into one Gemini prompt (1 disables it) and
+# the approximate input-token budget per batched prompt.
+GEMINI_BATCH_SIZE         = int(os.getenv("GEMINI_BATCH_SIZE", "1"))
+GEMINI_BATCH_TOKEN_BUDGET = int(os.getenv("GEMINI_BATCH_TOKEN_BUDGET", "24000"))
+
+# Approximate tokens of resume text sent to Gemini per resume after
+# condensing (experience and skills are kept first); 0 only cleans the text.
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "2000"))
+
+# Full sweeps: "role" runs the graph once per role folder; "resume" parses
+# each distinct file once and scores it against every role it was filed
+# under, optionally with one multi-role prompt per resume (GEMINI_MULTI_ROLE=1).
+RUN_MODE          = os.getenv("RUN_MODE", "role")
+GEMINI_MULTI_ROLE = os.getenv("GEMINI_MULTI_ROLE", "0") == "1"
+
+# Near-duplicate resubmissions (MinHash LSH per job): "reuse" copies the
+# earlier verdict, "defer" rescores them after everything else, "off"
+# disables the lookup. THRESHOLD is the estimated Jaccard similarity.
+NEAR_DUPLICATE_ACTION    = os.getenv("NEAR_DUPLICATE_ACTION", "reuse")
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+MINHASH_PERMUTATIONS     = int(os.getenv("MINHASH_PERMUTATIONS", "128"))
+MINHASH_BANDS            = int(os.getenv("MINHASH_BANDS", "16"))
+
+# Streaming pipeline (STREAMING_PIPELINE=1): download, parse, score and write
+# overlap per resume. BUFFER bounds each queue between stages, resumes are
+# scored in micro-batches of BATCH_SIZE, and a partial batch is flushed after
+# FLUSH_SECONDS.
+STREAMING_PIPELINE   = os.getenv("STREAMING_PIPELINE", "0") == "1"
+STREAM_BUFFER_SIZE   = int(os.getenv("STREAM_BUFFER_SIZE", "16"))
+STREAM_BATCH_SIZE    = int(os.getenv("STREAM_BATCH_SIZE", "16"))
+STREAM_FLUSH_SECONDS = float(os.getenv("STREAM_FLUSH_SECONDS", "5"))
+
+# Resilience for Gemini, Drive and Sheets calls: maximum concurrent calls per
+# API (halved on throttling, regrown on success), retry attempts with jittered
+# exponential backoff, and the consecutive-failure count that opens an API's
+# circuit breaker (pausing new work) for BREAKER_RESET_SECONDS.
+DRIVE_CONCURRENCY         = int(os.getenv("DRIVE_CONCURRENCY", "8"))
+SHEETS_CONCURRENCY        = int(os.getenv("SHEETS_CONCURRENCY", "2"))
+RETRY_MAX_ATTEMPTS        = int(os.getenv("RETRY_MAX_ATTEMPTS", "6"))
+RETRY_BASE_SECONDS        = float(os.getenv("RETRY_BASE_SECONDS", "1"))
+RETRY_MAX_SECONDS         = float(os.getenv("RETRY_MAX_SECONDS", "60"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS     = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+# Extraction caps: files above MAX_DOCUMENT_BYTES are skipped (checked from
+# Drive metadata before download) and only the first PDF_MAX_PAGES pages of
+# a PDF are read. 0 disables either cap.
+MAX_DOCUMENT_BYTES = int(os.getenv("MAX_DOCUMENT_BYTES", str(20 * 1024 * 1024)))
+PDF_MAX_PAGES      = int(os.getenv("PDF_MAX_PAGES", "30"))
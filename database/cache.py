@@ -0,0 +1,101 @@
+import datetime
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from database.mongo import mongo_db
+
+
+class TwoTierCache:
+    """
+    In-process LRU in front of a MongoDB collection.
+
+    Entries expire after `ttl_seconds` in both tiers (Mongo through a TTL
+    index). The LRU holds at most `max_memory` entries and the collection is
+    trimmed to `max_persistent` entries, oldest first. Mongo errors are logged
+    and treated as misses so a database outage only costs cache hits.
+    """
+
+    def __init__(self, collection_name, ttl_seconds, max_memory, max_persistent):
+        self.collection = mongo_db[collection_name]
+        self.ttl_seconds = ttl_seconds
+        self.max_memory = max_memory
+        self.max_persistent = max_persistent
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.indexed = False
+        self.writes = 0
+        self.stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+
+    def _ensure_indexes(self):
+        if self.indexed:
+            return
+        self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        self.indexed = True
+
+    def _remember(self, key, value, expires_at):
+        with self.lock:
+            self.memory[key] = (value, expires_at)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_memory:
+                self.memory.popitem(last=False)
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry and entry[1] > now:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[0]
+            if entry:
+                del self.memory[key]
+
+        try:
+            doc = self.collection.find_one({"_id": key})
+        except Exception as e:
+            logging.warning("Cache read failed for %s: %s", self.collection.name, e)
+            doc = None
+        if doc:
+            created = doc["created_at"].replace(tzinfo=datetime.timezone.utc).timestamp()
+            expires_at = created + self.ttl_seconds
+            if expires_at > now:
+                self._remember(key, doc["value"], expires_at)
+                self._count("persistent_hits")
+                return doc["value"]
+
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        self._remember(key, value, time.time() + self.ttl_seconds)
+        try:
+            self._ensure_indexes()
+            self.collection.replace_one(
+                {"_id": key},
+                {"_id": key, "value": value, "created_at": datetime.datetime.utcnow()},
+                upsert=True,
+            )
+            self.writes += 1
+            if self.writes % 100 == 0:
+                self._trim()
+        except Exception as e:
+            logging.warning("Cache write failed for %s: %s", self.collection.name, e)
+
+    def _trim(self):
+        excess = self.collection.estimated_document_count() - self.max_persistent
+        if excess <= 0:
+            return
+        oldest = self.collection.find({}, {"_id": 1}).sort("created_at", 1).limit(excess)
+        ids = [doc["_id"] for doc in oldest]
+        self.collection.delete_many({"_id": {"$in": ids}})
+        logging.info("Evicted %d entries from %s", len(ids), self.collection.name)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
@@ -1,21 +1,171 @@
 import datetime
-from pymongo import MongoClient
+import logging
+import time
+from contextlib import contextmanager
+from pymongo import MongoClient, UpdateOne, ASCENDING
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
 import os
 
+from services.metrics import observe
+from services.resilience import classify, SUCCESS, THROTTLED, TRANSIENT, PERMANENT
+
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 MONGO_DB = os.getenv("MONGO_DB", "recruitment")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "results")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
+
+CLIENT_OPTIONS = {
+    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+    "minPoolSize": MONGO_MIN_POOL_SIZE,
+    "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+    "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+}
 
-mongo_client = MongoClient(MONGO_URI)
+# connect=False defers the first connection until the first operation
+mongo_client = MongoClient(MONGO_URI, connect=False, **CLIENT_OPTIONS)
 mongo_db = mongo_client[MONGO_DB]
 mongo_results = mongo_db[MONGO_COLLECTION]
+
+def mongo_outcome(error):
+    """
+    Resilience outcome for a failed Mongo call, as classify() gives for the
+    HTTP APIs: lost connections and retryable writes are transient. Other
+    PyMongo errors are permanent; their `code` is a server error code, not
+    an HTTP status, so they must not go through classify().
+    """
+    if isinstance(error, ConnectionFailure):
+        return TRANSIENT
+    if not isinstance(error, PyMongoError):
+        return classify(error)
+    if error.has_error_label("RetryableWriteError"):
+        return TRANSIENT
+    if getattr(error, "code", None) == 16500:  # request rate too large (Cosmos DB's Mongo API)
+        return THROTTLED
+    return PERMANENT
+
+@contextmanager
+def mongo_call(operation):
+    """
+    Time the enclosed Mongo call into recruitment_external_call_seconds,
+    labelled with its outcome.
+    """
+    start = time.perf_counter()
+    outcome = SUCCESS
+    try:
+        yield
+    except Exception as e:
+        outcome = mongo_outcome(e)
+        raise
+    finally:
+        observe("recruitment_external_call_seconds", time.perf_counter() - start,
+                api="mongo", operation=operation, outcome=outcome)
+
+def candidate_key(match):
+    """
+    Upsert key for a match: the candidate's email, or the Drive file (id,
+    else name) when no email was extracted, so error rows and email-less
+    candidates do not overwrite each other.
+    """
+    email = (match.get("email") or "").strip().lower()
+    if email:
+        return email
+    return f"file:{match.get('file_id') or match.get('name') or ''}"
+
+def migrate_results():
+    """
+    Give documents written before candidate_key existed a key, then keep
+    only the newest document per (candidate_key, job_title) so the unique
+    index can be built.
+    """
+    legacy = mongo_results.find({"candidate_key": {"$exists": False}}, {"email": 1, "candidate": 1})
+    ops = [UpdateOne({"_id": doc["_id"]}, {"$set": {"candidate_key": candidate_key({
+        "email": doc.get("email"), "name": doc.get("candidate"),
+    })}}) for doc in legacy]
+    if ops:
+        mongo_results.bulk_write(ops, ordered=False)
+        logging.info("Backfilled candidate_key on %d result documents.", len(ops))
+
+    duplicates = mongo_results.aggregate([
+        {"$sort": {"timestamp": -1}},
+        {"$group": {"_id": {"key": "$candidate_key", "job": "$job_title"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    stale = [doc_id for group in duplicates for doc_id in group["ids"][1:]]
+    if stale:
+        mongo_results.delete_many({"_id": {"$in": stale}})
+        logging.info("Removed %d duplicate result documents.", len(stale))
+
+def ensure_indexes():
+    """
+    Create the indexes result upserts and lookups rely on. Safe to call
+    repeatedly; the full-collection migration only runs while the unique
+    index does not exist yet.
+    """
+    if "candidate_job_title" not in mongo_results.index_information():
+        migrate_results()
+    # Unique, so concurrent upserts of one new candidate cannot both insert
+    mongo_results.create_index([("candidate_key", ASCENDING), ("job_title", ASCENDING)],
+                               name="candidate_job_title", unique=True)
+    mongo_results.create_index([("email", ASCENDING), ("job_title", ASCENDING)], name="email_job_title")
+    mongo_results.create_index([("job_title", ASCENDING), ("score", ASCENDING)], name="job_title_score")
+
+def result_upserts(job_title, matches):
+    """
+    One upsert per match keyed on (candidate_key, job_title), mirroring the
+    Sheets writer's "latest result per candidate and job" rule.
+    """
+    now = datetime.datetime.utcnow()
+    ops = []
+    for match in matches:
+        key = candidate_key(match)
+        ops.append(UpdateOne(
+            {"candidate_key": key, "job_title": job_title},
+            {"$set": {
+                "candidate": match.get("name"),
+                "score": match.get("score"),
+                "status": match.get("status"),
+                "email": (match.get("email") or "").strip().lower(),
+                "candidate_key": key,
+                "job_title": job_title,
+                "timestamp": now
+            }},
+            upsert=True
+        ))
+    return ops
+
+def duplicate_key_retries(error, ops):
+    """
+    Ops from a failed bulk_write worth one more try: those that lost an
+    upsert race on the unique index (the retry updates the winner's
+    document). None when anything else failed.
+    """
+    errors = error.details.get("writeErrors", [])
+    if not errors or any(e.get("code") != 11000 for e in errors):
+        return None
+    return [ops[e["index"]] for e in errors]
+
+def store_results(job_title, matches):
+    ops = result_upserts(job_title, matches)
+    if not ops:
+        return
+    upserted = modified = 0
+    with mongo_call("results.bulk_write"):
+        try:
+            result = mongo_results.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            retry = duplicate_key_retries(e, ops)
+            if retry is None:
+                raise
+            logging.info("Retrying %d upserts for %s that lost a race on the unique index.", len(retry), job_title)
+            upserted, modified = e.details.get("nUpserted", 0), e.details.get("nModified", 0)
+            result = mongo_results.bulk_write(retry, ordered=False)
+    logging.info("Stored %d results for %s (%d upserted, %d modified).",
+                 len(ops), job_title, upserted + result.upserted_count, modified + result.modified_count)
+
 def store_result(job_title, match):
-    doc = {
-        "candidate": match.get("name"),
-        "score": match.get("score"),
-        "status": match.get("status"),
-        "email": match.get("email"),
-        "job_title": job_title,
-        "timestamp": datetime.datetime.utcnow()
-    }
-    mongo_results.insert_one(doc)
\ No newline at end of file
+    store_results(job_title, [match])
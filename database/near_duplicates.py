@@ -0,0 +1,132 @@
+import datetime
+import hashlib
+import logging
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from database.mongo import mongo_db
+
+WORD_RE = re.compile(r"\w+")
+SHINGLE_WORDS = 3
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """
+    crc32 of every `size`-word window of `text`, lowercased; whitespace,
+    punctuation and layout differences do not change the set.
+    """
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    return np.unique(np.fromiter(
+        (zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)),
+        dtype=np.uint64,
+    ))
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH over resume text, persisted in a MongoDB collection.
+
+    Each document stores one scored resume's signature, its banded LSH keys
+    and the verdict it got, scoped to a job. A lookup only fetches documents
+    sharing at least one band with the query, through a (job, bands)
+    multikey index, so its cost follows the number of candidates rather than
+    the size of the pool. Candidates are then checked against `threshold`
+    with the estimated Jaccard similarity. Mongo errors are logged and
+    treated as "no duplicate".
+    """
+
+    def __init__(self, collection_name, threshold, ttl_seconds, num_perm=128, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.collection = mongo_db[collection_name]
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.lock = threading.Lock()
+        self.indexed = False
+        self.stats = {"lookups": 0, "candidates": 0, "hits": 0}
+
+    def _ensure_indexes(self):
+        if self.indexed:
+            return
+        self.collection.create_index([("job", 1), ("bands", 1)])
+        self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        self.indexed = True
+
+    def _count(self, stat, n=1):
+        with self.lock:
+            self.stats[stat] += n
+
+    def signature(self, text):
+        # Universal hashing (a*x + b) mod p per permutation; uint64 products
+        # wrap, which keeps the family well mixed and costs one vector op
+        values = shingles(text)
+        hashed = (np.outer(values, self.a) + self.b) % MERSENNE_PRIME
+        return hashed.min(axis=0)
+
+    def band_keys(self, signature):
+        return [
+            f"{i}:{hashlib.blake2b(signature[i * self.rows:(i + 1) * self.rows].tobytes(), digest_size=8).hexdigest()}"
+            for i in range(self.bands)
+        ]
+
+    def find(self, job, text):
+        """
+        (verdict, similarity, name) of the most similar resume already scored
+        for `job`, or None when nothing reaches the threshold.
+        """
+        self._count("lookups")
+        signature = self.signature(text)
+        try:
+            candidates = list(self.collection.find(
+                {"job": job, "bands": {"$in": self.band_keys(signature)}},
+                {"signature": 1, "verdict": 1, "name": 1},
+            ).limit(50))
+        except Exception as e:
+            logging.warning("Near-duplicate lookup failed for %s: %s", self.collection.name, e)
+            return None
+        self._count("candidates", len(candidates))
+
+        best = None
+        for doc in candidates:
+            similarity = float(np.mean(np.asarray(doc["signature"], dtype=np.uint64) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (doc["verdict"], similarity, doc.get("name", ""))
+        if best:
+            self._count("hits")
+        return best
+
+    def add(self, job, text, verdict, name=""):
+        signature = self.signature(text)
+        key = hashlib.sha256(f"{job}\0{text}".encode("utf-8")).hexdigest()
+        try:
+            self._ensure_indexes()
+            self.collection.replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "job": job,
+                    "name": name,
+                    "bands": self.band_keys(signature),
+                    "signature": [int(v) for v in signature],
+                    "verdict": verdict,
+                    "created_at": datetime.datetime.utcnow(),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logging.warning("Near-duplicate write failed for %s: %s", self.collection.name, e)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
@@ -1,6 +1,28 @@
-from workflows.recruitment_graph import build_graph
+import argparse
+
+from services.sheets import read_job_role
+from workflows.batch_runner import run_roles, format_summary, completed
+from workflows.resume_major import run_resume_major
+from config.logging_setup import setup_logging
+from config.settings import ROLE_PARALLELISM, RUN_MODE
 
 if __name__ == "__main__":
-    app = build_graph()
-    result = app.invoke({})
-    print("Done:", result)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Score every role's resume folder.")
+    parser.add_argument("--run-id", help="resume an interrupted run instead of starting a new one")
+    parser.add_argument("--parallelism", type=int, default=ROLE_PARALLELISM, help="roles processed at once")
+    parser.add_argument("--mode", choices=("role", "resume"), default=RUN_MODE,
+                        help="run the graph per role, or parse each distinct resume once and score it for every role")
+    args = parser.parse_args()
+    setup_logging("main.log")
+
+    roles = read_job_role()
+    if args.mode == "resume":
+        print(format_summary(run_resume_major(roles)))
+        print(f"Done: resume-major sweep ({len(roles)} roles).")
+    else:
+        run_id, summaries = run_roles(roles, parallelism=args.parallelism, run_id=args.run_id)
+        print(format_summary(summaries))
+        if all(completed(s) for s in summaries):
+            print(f"Done: run {run_id} ({len(roles)} roles).")
+        else:
+            print(f"Done: run {run_id} ({len(roles)} roles). Re-run with --run-id {run_id} to resume.")
@@ -1,25 +1,67 @@
-from googleapiclient.discovery import build
-from services.auth import get_google_credentials
+import io
+from googleapiclient.http import MediaIoBaseDownload
+from services.google_clients import get_service
+from services.resilience import execute, policies
+from services.metrics import inc
+from config.settings import DRIVE_CHUNK_SIZE
 # from config.settings import GOOGLE_DRIVE_FOLDER_ID
 
+# Metadata requested for every listed file; md5Checksum/modifiedTime let the
+# parser skip files it has already seen.
+FILE_FIELDS = "id, name, mimeType, md5Checksum, modifiedTime, size"
+RESUME_MIME_TYPES = (
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/msword",
+)
+
 def get_drive_service():
-    creds = get_google_credentials()
-    return build('drive', 'v3', credentials=creds)
+    return get_service('drive', 'v3')
 
-def list_resumes(folder_id):
+def list_files(q, **kwargs):
+    """
+    Every file matching `q`, following nextPageToken through all pages.
+    """
     service = get_drive_service()
-    q = (
-        f"'{folder_id}' in parents and "
-        "("
-        "mimeType='application/pdf' or "
-        "mimeType='application/vnd.openxmlformats-officedocument.wordprocessingml.document' or "
-        "mimeType='application/msword'"
-        ")"
-    )
-    return service.files().list(q=q).execute().get('files', [])
+    files = []
+    page_token = None
+    while True:
+        response = execute("drive", service.files().list(
+            q=q,
+            fields=f"nextPageToken, files({FILE_FIELDS})",
+            pageSize=1000,
+            pageToken=page_token,
+            **kwargs
+        ))
+        files.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return files
 
-def download_file(file_id: str, dest_path: str):
+def list_resumes(folder_id):
+    mime_types = " or ".join(f"mimeType='{m}'" for m in RESUME_MIME_TYPES)
+    return list_files(f"'{folder_id}' in parents and trashed = false and ({mime_types})")
+
+def download_bytes(file_id: str, chunk_size: int = DRIVE_CHUNK_SIZE) -> bytes:
+    """
+    Stream a file's content into memory in `chunk_size` pieces.
+    """
     service = get_drive_service()
     req = service.files().get_media(fileId=file_id)
+    buf = io.BytesIO()
+    downloader = MediaIoBaseDownload(buf, req, chunksize=chunk_size)
+    done = False
+    while not done:
+        # A failed chunk leaves the downloader's offset alone, so retrying is safe
+        _, done = policies["drive"].call(downloader.next_chunk, operation="drive.files.get_media")
+    data = buf.getvalue()
+    inc("recruitment_drive_download_bytes_total", len(data))
+    return data
+
+def download_file(file_id: str, dest_path: str):
     with open(dest_path, 'wb') as fh:
-        fh.write(req.execute())
+        fh.write(download_bytes(file_id))
+
+def file_ref(f):
+    """Subset of Drive file metadata carried in workflow state."""
+    return {k: f.get(k) for k in ("id", "name", "mimeType", "md5Checksum", "modifiedTime", "size")}
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+import uuid
+
+from services.drive import get_drive_service
+from services.resilience import execute
+from database.mongo import mongo_db
+from config.settings import DRIVE_CHANNEL_TTL_SECONDS, DRIVE_CHANNEL_RENEW_BEFORE_SECONDS
+
+
+class ChannelManager:
+    """
+    Owns the Drive watch channels for role folders.
+
+    Channels (id, resourceId, folder, expiration) are persisted in Mongo so a
+    restart can rebuild the channel -> folder map instead of orphaning live
+    channels. `sync` registers a channel only for folders that have none,
+    renews channels shortly before they expire and stops superseded or
+    unwatched ones.
+    """
+
+    def __init__(self, webhook_url, collection="drive_channels",
+                 ttl=DRIVE_CHANNEL_TTL_SECONDS, renew_before=DRIVE_CHANNEL_RENEW_BEFORE_SECONDS):
+        self.webhook_url = webhook_url
+        self.collection = mongo_db[collection]
+        self.ttl = ttl
+        self.renew_before = renew_before
+        self.channels = {}
+        self.lock = threading.RLock()
+
+    def load(self):
+        """
+        Rebuild the in-memory map from Mongo, dropping expired channels.
+        """
+        now_ms = time.time() * 1000
+        with self.lock:
+            self.channels = {}
+            for doc in self.collection.find({}):
+                if doc["expiration"] > now_ms:
+                    self.channels[doc["_id"]] = doc
+                else:
+                    self.collection.delete_one({"_id": doc["_id"]})
+        logging.info("Loaded %d live Drive channels.", len(self.channels))
+
+    def folder_for(self, channel_id):
+        with self.lock:
+            doc = self.channels.get(channel_id)
+        return doc["folder_id"] if doc else None
+
+    def watched_folders(self):
+        with self.lock:
+            return {doc["folder_id"] for doc in self.channels.values()}
+
+    def register(self, folder_id):
+        expiration_ms = int((time.time() + self.ttl) * 1000)
+        body = {
+            "id": str(uuid.uuid4()),
+            "type": "webhook",
+            "address": self.webhook_url,
+            "expiration": expiration_ms,
+        }
+        watch = execute("drive", get_drive_service().files().watch(fileId=folder_id, body=body), idempotent=False)
+        doc = {
+            "_id": watch["id"],
+            "resource_id": watch["resourceId"],
+            "folder_id": folder_id,
+            "expiration": int(watch.get("expiration", expiration_ms)),
+        }
+        self.collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+        with self.lock:
+            self.channels[doc["_id"]] = doc
+        logging.info(f"Registered webhook for subfolder {folder_id}: Channel ID {doc['_id']}")
+        return doc
+
+    def stop(self, doc):
+        try:
+            execute("drive", get_drive_service().channels().stop(body={"id": doc["_id"], "resourceId": doc["resource_id"]}))
+        except Exception as e:
+            # Already expired or stopped channels answer 404; forget them anyway
+            logging.warning(f"Error stopping channel {doc['_id']}: {e}")
+        self.collection.delete_one({"_id": doc["_id"]})
+        with self.lock:
+            self.channels.pop(doc["_id"], None)
+        logging.info(f"Stopped channel {doc['_id']} for folder {doc['folder_id']}")
+
+    def unwatch(self, folder_id):
+        """
+        Stop every channel watching `folder_id`.
+        """
+        with self.lock:
+            docs = [doc for doc in self.channels.values() if doc["folder_id"] == folder_id]
+        for doc in docs:
+            self.stop(doc)
+
+    def ensure(self, folder_id):
+        """
+        Make sure `folder_id` has exactly one channel that is not about to expire.
+        """
+        renew_at_ms = (time.time() + self.renew_before) * 1000
+        with self.lock:
+            existing = sorted(
+                (doc for doc in self.channels.values() if doc["folder_id"] == folder_id),
+                key=lambda doc: doc["expiration"], reverse=True
+            )
+            if existing and existing[0]["expiration"] > renew_at_ms:
+                keep, superseded = existing[0], existing[1:]
+            else:
+                keep, superseded = None, existing
+        if keep is None:
+            self.register(folder_id)
+        for doc in superseded:
+            self.stop(doc)
+
+    def sync(self, folder_ids):
+        """
+        Ensure a live channel for every folder in `folder_ids` and stop the
+        channels of folders that are no longer watched.
+        """
+        folder_ids = set(folder_ids)
+        for folder_id in folder_ids:
+            try:
+                self.ensure(folder_id)
+            except Exception as e:
+                logging.error(f"Error registering webhook for folder {folder_id}: {e}", exc_info=True)
+        with self.lock:
+            stale = [doc for doc in self.channels.values() if doc["folder_id"] not in folder_ids]
+        for doc in stale:
+            self.stop(doc)
@@ -0,0 +1,47 @@
+import logging
+import threading
+
+import httplib2
+import google_auth_httplib2
+from googleapiclient.discovery import build
+
+from services.auth import get_google_credentials
+from config.settings import GOOGLE_HTTP_TIMEOUT
+
+credentials = None
+credentials_lock = threading.Lock()
+
+# httplib2 transports (and the clients built on them) are not thread-safe,
+# so each thread keeps its own set. Long-lived worker threads therefore reuse
+# one authorized keep-alive connection per API instead of a new TLS
+# handshake per call.
+local = threading.local()
+
+def get_credentials():
+    """
+    Service-account credentials, loaded from disk once per process.
+    """
+    global credentials
+    with credentials_lock:
+        if credentials is None:
+            credentials = get_google_credentials()
+        return credentials
+
+def get_service(api, version):
+    """
+    Cached discovery client for `api`/`version` bound to this thread's transport.
+    """
+    services = getattr(local, "services", None)
+    if services is None:
+        services = local.services = {}
+    service = services.get((api, version))
+    if service is None:
+        http = google_auth_httplib2.AuthorizedHttp(
+            get_credentials(), http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT)
+        )
+        # static_discovery reads the bundled discovery document instead of
+        # fetching it over the network on every build
+        service = build(api, version, http=http, cache_discovery=False, static_discovery=True)
+        services[(api, version)] = service
+        logging.info("Built %s %s client for thread %s", api, version, threading.current_thread().name)
+    return service
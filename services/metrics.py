@@ -0,0 +1,150 @@
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) shared by every latency histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# name -> (type, help); only declared metrics can be recorded
+METRICS = {
+    "recruitment_node_seconds": ("histogram", "Wall time of each LangGraph node."),
+    "recruitment_external_call_seconds": ("histogram", "Latency of each attempt at an external call."),
+    "recruitment_external_retries_total": ("counter", "External call attempts that were retried."),
+    "recruitment_drive_download_bytes_total": ("counter", "Bytes downloaded from Drive."),
+    "recruitment_gemini_prompt_tokens_total": ("counter", "Prompt tokens sent to Gemini."),
+    "recruitment_gemini_response_tokens_total": ("counter", "Response tokens received from Gemini."),
+}
+
+
+class Registry:
+    """
+    Minimal thread-safe counter/histogram store rendered in the Prometheus
+    text exposition format.
+    """
+
+    def __init__(self, metrics=METRICS, buckets=BUCKETS):
+        self.metrics = metrics
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    @staticmethod
+    def _labels(pairs, extra=()):
+        pairs = list(pairs) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {k: {**v, "buckets": list(v["buckets"])} for k, v in self.histograms.items()}
+        lines = []
+        for name, (kind, help_text) in self.metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{self._labels(labels)} {value}")
+                continue
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets, hist["buckets"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {hist['count']}")
+                lines.append(f"{name}_sum{self._labels(labels)} {hist['sum']:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+render = registry.render
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+# Per-run trace id, set by graph nodes from state["trace_id"] and prefixed
+# to every log line written while it is set
+current_trace = contextvars.ContextVar("trace_id", default=None)
+
+class TraceFilter(logging.Filter):
+    def filter(self, record):
+        trace = current_trace.get()
+        if trace and not getattr(record, "traced", False):
+            record.msg = f"[trace {trace}] {record.msg}"
+            record.traced = True
+        return True
+
+logging.getLogger().addFilter(TraceFilter())
+
+def propagate(fn):
+    """
+    Wrap `fn` so it runs under the caller's trace id on another thread
+    (thread pools do not inherit context variables).
+    """
+    trace = current_trace.get()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        token = current_trace.set(trace)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            current_trace.reset(token)
+    return run
+
+def instrument_node(name, fn):
+    """
+    Graph node wrapper: times the node and runs it under the state's trace id.
+    """
+    @functools.wraps(fn)
+    def run(state):
+        token = current_trace.set(state.get("trace_id") or current_trace.get())
+        start = time.perf_counter()
+        try:
+            return fn(state)
+        finally:
+            seconds = time.perf_counter() - start
+            observe("recruitment_node_seconds", seconds, node=name)
+            logging.info("Node %s finished in %.3fs", name, seconds)
+            current_trace.reset(token)
+    return run
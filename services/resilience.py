@@ -0,0 +1,226 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+
+from config.settings import (
+    GEMINI_CONCURRENCY, DRIVE_CONCURRENCY, SHEETS_CONCURRENCY,
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS,
+)
+from services.metrics import inc, observe
+
+# Outcomes of one attempt
+SUCCESS, THROTTLED, TRANSIENT, PERMANENT = "success", "throttled", "transient", "permanent"
+
+
+def status_of(error):
+    """
+    HTTP status behind an exception from googleapiclient (HttpError.resp) or
+    google.api_core (GoogleAPICallError.code), or None.
+    """
+    resp = getattr(error, "resp", None)
+    status = getattr(resp, "status", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+def classify(error):
+    status = status_of(error)
+    if status == 429:
+        return THROTTLED
+    # Drive and Sheets report per-user quota as 403 rateLimitExceeded
+    if status == 403 and "ratelimitexceeded" in str(error).lower():
+        return THROTTLED
+    if status is not None and status >= 500:
+        return TRANSIENT
+    if status is None and isinstance(error, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+    return PERMANENT
+
+def retry_after(error):
+    """
+    Seconds the server asked us to wait (Retry-After, as seconds or an HTTP
+    date), or None.
+    """
+    headers = getattr(error, "resp", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+def backoff_delay(attempt, base=RETRY_BASE_SECONDS, cap=RETRY_MAX_SECONDS, server_delay=None):
+    """
+    Full-jitter exponential backoff, never shorter than the server's
+    Retry-After.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    return max(delay, server_delay or 0.0)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit that grows by about one slot per window of successful
+    calls and halves on throttling (additive increase, multiplicative
+    decrease), so in-flight calls settle just under the API's quota.
+    """
+
+    def __init__(self, maximum, minimum=1, initial=None):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(initial or self.maximum)
+        self.in_flight = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, outcome):
+        with self.cond:
+            self.in_flight -= 1
+            if outcome == THROTTLED:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif outcome == SUCCESS:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive throttled/transient failures and
+    stays open for `reset_seconds`. Callers wait out an open breaker instead
+    of failing, and the first call after it is a probe: success closes the
+    breaker, failure reopens it.
+    """
+
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        with self.lock:
+            return max(0.0, self.open_until - time.monotonic())
+
+    def wait(self):
+        delay = self.remaining()
+        while delay > 0:
+            time.sleep(delay)
+            delay = self.remaining()
+
+    def record(self, outcome):
+        with self.lock:
+            if outcome == SUCCESS:
+                self.failures = 0
+            elif outcome in (THROTTLED, TRANSIENT):
+                self.failures += 1
+                if self.failures >= self.threshold:
+                    self.open_until = time.monotonic() + self.reset_seconds
+                    self.failures = self.threshold - 1  # one more failure reopens it
+                    return True
+        return False
+
+
+class ResiliencePolicy:
+    """
+    Retries, AIMD concurrency and a circuit breaker for one external API.
+    """
+
+    def __init__(self, name, concurrency, attempts=RETRY_MAX_ATTEMPTS, base=RETRY_BASE_SECONDS,
+                 cap=RETRY_MAX_SECONDS, breaker=None):
+        self.name = name
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.limiter = AIMDLimiter(concurrency)
+        self.breaker = breaker or CircuitBreaker()
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "breaker_trips": 0}
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def call(self, fn, *args, idempotent=True, operation=None, before_attempt=None, **kwargs):
+        """
+        Call `fn` with retries. Non-idempotent calls (appends, row deletes,
+        channel creation) are only retried on throttling, where the server
+        is known to have rejected the request. Each attempt's latency is
+        recorded under `operation`. `before_attempt` (e.g. an RPM token
+        bucket's acquire) runs ahead of every attempt, before a concurrency
+        slot is taken and outside the recorded latency.
+        """
+        self._count("calls")
+        operation = operation or self.name
+        for attempt in range(self.attempts):
+            self.breaker.wait()
+            if before_attempt is not None:
+                before_attempt()
+            self.limiter.acquire()
+            outcome = SUCCESS
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                outcome = classify(e)
+                if outcome == THROTTLED:
+                    self._count("throttled")
+                retryable = outcome == THROTTLED or (outcome == TRANSIENT and idempotent)
+                if not retryable or attempt == self.attempts - 1:
+                    self._count("failures")
+                    raise
+                delay = backoff_delay(attempt, self.base, self.cap, retry_after(e))
+                logging.warning(f"{self.name} call failed ({outcome}: {e}); retry {attempt + 1} in {delay:.1f}s")
+                self._count("retries")
+                inc("recruitment_external_retries_total", api=self.name, operation=operation)
+            finally:
+                observe("recruitment_external_call_seconds", time.perf_counter() - start,
+                        api=self.name, operation=operation, outcome=outcome)
+                self.limiter.release(outcome)
+                if self.breaker.record(outcome):
+                    self._count("breaker_trips")
+                    logging.warning(f"{self.name} circuit open for {self.breaker.reset_seconds}s")
+            time.sleep(delay)
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["concurrency_limit"] = round(self.limiter.limit, 2)
+        stats["breaker_open_seconds"] = round(self.breaker.remaining(), 1)
+        return stats
+
+
+policies = {
+    "gemini": ResiliencePolicy("gemini", GEMINI_CONCURRENCY),
+    "drive": ResiliencePolicy("drive", DRIVE_CONCURRENCY),
+    "sheets": ResiliencePolicy("sheets", SHEETS_CONCURRENCY),
+}
+
+def execute(api, request, idempotent=True):
+    """
+    `request.execute()` for a googleapiclient request under `api`'s policy.
+    """
+    return policies[api].call(request.execute, idempotent=idempotent, operation=getattr(request, "methodId", None))
+
+def pause_seconds():
+    """
+    How long new work should wait for an open breaker on any API.
+    """
+    return max(policy.breaker.remaining() for policy in policies.values())
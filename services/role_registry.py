@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+
+from services.sheets import read_job_role
+from config.settings import ROLE_CACHE_TTL_SECONDS
+
+
+def title_key(title):
+    return (title or "").strip().lower()
+
+
+class RoleDiff:
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added = list(added)
+        self.removed = list(removed)
+        self.changed = list(changed)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return f"RoleDiff(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+
+class RoleRegistry:
+    """
+    TTL cache of the Roles tab with O(1) lookup by folder id and by title.
+
+    Reads go to Sheets at most once per `ttl` seconds (or after `invalidate`).
+    If a reload fails the previous snapshot keeps being served. Every reload
+    that changes the roles is passed to the `subscribe`d listeners, whichever
+    lookup triggered it; the initial load is not a change.
+    """
+
+    def __init__(self, loader=read_job_role, ttl=ROLE_CACHE_TTL_SECONDS):
+        self.loader = loader
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self.snapshot = []
+        self.folders = {}
+        self.titles = {}
+        self.listeners = []
+        self.loaded = False
+
+    def subscribe(self, listener):
+        """
+        Call `listener(diff)` after each reload that added, removed or
+        changed roles.
+        """
+        self.listeners.append(listener)
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = None
+
+    def _stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.ttl
+
+    def refresh(self, force=False):
+        """
+        Reload the tab when stale (or when `force`d) and return what changed
+        since the previous snapshot.
+        """
+        with self.lock:
+            if not force and not self._stale():
+                return RoleDiff()
+            try:
+                roles = self.loader()
+            except Exception as e:
+                if self.loaded_at is None and not self.snapshot:
+                    raise
+                logging.error("Role reload failed, serving previous snapshot: %s", e, exc_info=True)
+                self.loaded_at = time.monotonic()
+                return RoleDiff()
+
+            initial, self.loaded = not self.loaded, True
+            previous = self.folders
+            folders = {role["folder_id"]: role for role in roles}
+            diff = RoleDiff(
+                added=[r for f, r in folders.items() if f not in previous],
+                removed=[r for f, r in previous.items() if f not in folders],
+                changed=[r for f, r in folders.items() if f in previous and previous[f] != r],
+            )
+            self.snapshot = roles
+            self.folders = folders
+            self.titles = {title_key(role["title"]): role for role in roles}
+            self.loaded_at = time.monotonic()
+        if diff and not initial:
+            logging.info("Roles reloaded: %r", diff)
+            # Outside the lock: listeners may look roles up again
+            for listener in self.listeners:
+                try:
+                    listener(diff)
+                except Exception as e:
+                    logging.error("Role change listener failed: %s", e, exc_info=True)
+        return diff
+
+    def roles(self):
+        self.refresh()
+        with self.lock:
+            return list(self.snapshot)
+
+    def by_folder(self, folder_id):
+        self.refresh()
+        with self.lock:
+            return self.folders.get(folder_id)
+
+    def by_title(self, title):
+        self.refresh()
+        with self.lock:
+            return self.titles.get(title_key(title))
@@ -1,25 +1,18 @@
-from googleapiclient.discovery import build
-from services.auth import get_google_credentials
+from services.google_clients import get_service
+from services.resilience import execute
 from config.settings import GOOGLE_SHEET_ID
 import logging
-import os
+import threading
+from collections import Counter
+
+# The Results writer deletes rows by the index it just read, so concurrent
+# writers (parallel roles, work-queue workers, streaming flushes) take turns
+results_lock = threading.Lock()
 
-# Setup logging
-log_dir = ".logs"
-os.makedirs(log_dir, exist_ok=True)
-log_path = os.path.join(log_dir, "services.log")
-logging.basicConfig(
-    filename=log_path,
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 
 def get_sheets_service():
     try:
-        logging.info("Getting Google Sheets service.")
-        creds = get_google_credentials()
-        return build('sheets', 'v4', credentials=creds)
+        return get_service('sheets', 'v4')
     except Exception as e:
         logging.error("Failed to get Google Sheets service: %s", e, exc_info=True)
         raise
@@ -28,25 +21,78 @@ def read_job_role():
     try:
         logging.info("Reading job roles from sheet.")
         svc = get_sheets_service().spreadsheets()
-        vals = svc.values().get(
+        vals = execute("sheets", svc.values().get(
             spreadsheetId=GOOGLE_SHEET_ID,
-            range="Roles!A2:C"
-        ).execute().get("values", [])
+            range="Roles!A2:E"
+        )).get("values", [])
         roles = []
         for row in vals:
             if len(row) >= 3:
-                roles.append({
+                role = {
                     "title": row[0],
                     "responsibilities": row[1],
                     "folder_id": row[2]
-                })
+                }
+                # Optional per-role prefilter settings: D = threshold, E = top K
+                for idx, key, cast in ((3, "prefilter_threshold", float), (4, "prefilter_top_k", int)):
+                    if len(row) > idx and str(row[idx]).strip():
+                        try:
+                            role[key] = cast(row[idx])
+                        except ValueError:
+                            logging.warning("Ignoring invalid %s %r for role %s", key, row[idx], row[0])
+                roles.append(role)
         logging.info("Successfully read %d job roles.", len(roles))
         return roles
     except Exception as e:
         logging.error("Error reading job roles: %s", e, exc_info=True)
         raise
 
-def write_results_to_results_tab(job_title, matches):
+def merge_row_ranges(rows):
+    """
+    Collapse sorted 0-based row indices into half-open [start, end) ranges.
+    """
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row:
+            ranges[-1][1] = row + 1
+        else:
+            ranges.append([row, row + 1])
+    return ranges
+
+def result_key(email, job_title):
+    return (email or "").strip().lower(), (job_title or "").strip().lower()
+
+def results_row_counts(job_title):
+    """
+    Results tab rows per (email, job title) key for `job_title`, to pass as
+    `replaceable` to a run that writes in several flushes.
+    """
+    values = execute("sheets", get_sheets_service().spreadsheets().values().get(
+        spreadsheetId=GOOGLE_SHEET_ID,
+        range="Results!A2:E"
+    )).get("values", [])
+    jt = result_key("", job_title)[1]
+    keys = (result_key(row[3] if len(row) > 3 else "", row[4] if len(row) > 4 else "") for row in values)
+    return Counter(key for key in keys if key[1] == jt)
+
+def write_results_to_results_tab(job_title, matches, replaceable=None):
+    """
+    Replace any existing rows for the same (email, job title) with the new
+    matches. The read, delete and append run as one step per process.
+
+    With `replaceable` (from results_row_counts, taken before the first
+    flush) only that many of the oldest rows per key are deleted, and the
+    counts are used up, so later flushes of the same run keep the rows the
+    earlier ones appended.
+    """
+    with results_lock:
+        replace_results(job_title, matches, replaceable)
+
+def replace_results(job_title, matches, replaceable=None):
+    """
+    write_results_to_results_tab without the lock: one read, one
+    batchUpdate for every deletion and one append.
+    """
     try:
         logging.info("Writing results to Results tab for job title: %s", job_title)
         service = get_sheets_service()
@@ -54,59 +100,70 @@ def write_results_to_results_tab(job_title, matches):
         SHEET_NAME = "Results"
         RANGE = f"{SHEET_NAME}!A:E"
 
-        result = sheet.values().get(
+        result = execute("sheets", sheet.values().get(
             spreadsheetId=GOOGLE_SHEET_ID,
             range=f"{SHEET_NAME}!A1:E"
-        ).execute()
-        values = result.get("values", [])[1:]  
+        ))
+        values = result.get("values", [])[1:]
 
-        spreadsheet = sheet.get(spreadsheetId=GOOGLE_SHEET_ID).execute()
-        sheet_id = next(s['properties']['sheetId'] for s in spreadsheet['sheets'] if s['properties']['title'] == SHEET_NAME)
+        # (email, job title) -> sheet row indices (0-based, row 0 is the header)
+        index = {}
+        for idx, row in enumerate(values):
+            row_email = row[3].strip().lower() if len(row) > 3 else ""
+            row_jt = row[4].strip().lower() if len(row) > 4 else ""
+            index.setdefault((row_email, row_jt), []).append(idx + 1)
 
+        jt = job_title.strip().lower()
+        rows = []
+        keys = set()
         for match in matches:
-            name = match["name"]
-            score = match["score"]
-            status = match.get("status", "")
-            email = match.get("email", "").strip().lower()
-            jt = job_title.strip().lower()
-
-            rows_to_delete = []
-            for idx, row in enumerate(values):
-                row_email = row[3].strip().lower() if len(row) > 3 else ""
-                row_jt = row[4].strip().lower() if len(row) > 4 else ""
-                if row_email == email and row_jt == jt:
-                    rows_to_delete.append(idx + 2)  
+            email = (match.get("email") or "").strip().lower()
+            keys.add((email, jt))
+            rows.append([match["name"], match["score"], match.get("status", ""), email, job_title])
 
-            for row_idx in reversed(rows_to_delete):
-                logging.info("Deleting duplicate row at index %d for email/job_title.", row_idx)
-                sheet.batchUpdate(
-                    spreadsheetId=GOOGLE_SHEET_ID,
-                    body={
-                        "requests": [
-                            {
-                                "deleteDimension": {
-                                    "range": {
-                                        "sheetId": sheet_id,
-                                        "dimension": "ROWS",
-                                        "startIndex": row_idx - 1,
-                                        "endIndex": row_idx
-                                    }
+        # Appends land at the bottom, so a key's rows from before the run come first
+        found = {key: index.get(key, [])[:None if replaceable is None else replaceable.get(key, 0)] for key in keys}
+        rows_to_delete = sorted(row for rows_for_key in found.values() for row in rows_for_key)
+        if rows_to_delete:
+            spreadsheet = execute("sheets", sheet.get(spreadsheetId=GOOGLE_SHEET_ID, fields="sheets.properties"))
+            sheet_id = next(s['properties']['sheetId'] for s in spreadsheet['sheets'] if s['properties']['title'] == SHEET_NAME)
+            # Bottom-up, so earlier deletions don't shift the later ranges
+            ranges = merge_row_ranges(rows_to_delete)
+            logging.info("Deleting %d duplicate rows in %d ranges for job title: %s", len(rows_to_delete), len(ranges), job_title)
+            # Deletes and appends are not safe to repeat, so they are only
+            # retried when the API rejected them outright (429)
+            execute("sheets", sheet.batchUpdate(
+                spreadsheetId=GOOGLE_SHEET_ID,
+                body={
+                    "requests": [
+                        {
+                            "deleteDimension": {
+                                "range": {
+                                    "sheetId": sheet_id,
+                                    "dimension": "ROWS",
+                                    "startIndex": start,
+                                    "endIndex": end
                                 }
                             }
-                        ]
-                    }
-                ).execute()
+                        }
+                        for start, end in reversed(ranges)
+                    ]
+                }
+            ), idempotent=False)
+            if replaceable is not None:
+                for key, rows_for_key in found.items():
+                    if rows_for_key:
+                        replaceable[key] -= len(rows_for_key)
 
-            # Append the new result
-            logging.info("Appending result for candidate: %s, job title: %s", name, job_title)
-            sheet.values().append(
+        if rows:
+            logging.info("Appending %d results for job title: %s", len(rows), job_title)
+            execute("sheets", sheet.values().append(
                 spreadsheetId=GOOGLE_SHEET_ID,
                 range=RANGE,
                 valueInputOption="RAW",
-                body={"values": [[name, score, status, email, job_title]]}
-            ).execute()
+                body={"values": rows}
+            ), idempotent=False)
         logging.info("Finished writing results for job title: %s", job_title)
     except Exception as e:
         logging.error("Error writing results to Results tab: %s", e, exc_info=True)
         raise
-
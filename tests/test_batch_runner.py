@@ -0,0 +1,79 @@
+import sqlite3
+from typing import TypedDict
+
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+from langgraph.graph import StateGraph, END
+
+from workflows import batch_runner
+
+ROLES = [{"title": "Data Engineer", "folder_id": "f1"}, {"title": "Analyst", "folder_id": "f2"}]
+
+
+class State(TypedDict, total=False):
+    job: dict
+    matches: list
+    stored: bool
+
+
+def fake_graph(failing=()):
+    def score(state):
+        if state["job"]["folder_id"] in failing:
+            raise RuntimeError("scoring failed")
+        return {"matches": [], "stored": True}
+
+    def build_graph(checkpointer=None):
+        wf = StateGraph(State)
+        wf.add_node("score", score)
+        wf.set_entry_point("score")
+        wf.add_edge("score", END)
+        return wf.compile(checkpointer=checkpointer)
+    return build_graph
+
+
+@pytest.fixture
+def checkpoints(tmp_path, monkeypatch):
+    """
+    Path of the checkpoint DB run_roles opens, and the connections it opened.
+    """
+    path = str(tmp_path / "runs.sqlite")
+    opened = []
+
+    def open_checkpointer():
+        saver = batch_runner.SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+        opened.append(saver.conn)
+        return saver
+    monkeypatch.setattr(batch_runner, "open_checkpointer", open_checkpointer)
+    return path, opened
+
+
+def threads(path):
+    with sqlite3.connect(path) as conn:
+        return {row[0] for row in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")}
+
+
+def test_completed_run_is_pruned_and_its_connection_closed(checkpoints, monkeypatch):
+    path, opened = checkpoints
+    monkeypatch.setattr(batch_runner, "build_graph", fake_graph())
+
+    _, summaries = batch_runner.run_roles(ROLES, parallelism=2)
+
+    assert [s["outcome"] for s in summaries] == ["done", "done"]
+    assert threads(path) == set()
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+
+
+def test_failed_run_keeps_checkpoints_until_resumed(checkpoints, monkeypatch):
+    path, _ = checkpoints
+    monkeypatch.setattr(batch_runner, "build_graph", fake_graph(failing={"f2"}))
+    run_id, summaries = batch_runner.run_roles(ROLES)
+    assert [s["outcome"] for s in summaries] == ["done", "failed: RuntimeError"]
+    assert f"{run_id}:f1" in threads(path)
+
+    monkeypatch.setattr(batch_runner, "build_graph", fake_graph())
+    _, summaries = batch_runner.run_roles(ROLES, run_id=run_id)
+    assert [s["outcome"] for s in summaries] == ["already done", "resumed"]
+    assert threads(path) == set()
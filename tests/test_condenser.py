@@ -0,0 +1,23 @@
+from agents.condenser import condense
+from agents.resume_matcher import estimate_tokens
+
+
+def test_over_budget_first_line_is_truncated_not_dropped():
+    text = "Built " + "streaming data pipelines " * 400  # one long line, no sections
+
+    short = condense(text, budget=50)
+
+    assert short
+    assert text.startswith(short)
+    assert estimate_tokens(short) <= 50
+    assert not short.endswith(" ")
+
+
+def test_budget_cuts_lower_priority_sections_first():
+    text = "EDUCATION\nBSc Computer Science\nEXPERIENCE\n" + "Ran Spark jobs at scale. " * 40
+
+    short = condense(text, budget=60)
+
+    assert short.startswith("EXPERIENCE\nRan Spark jobs")
+    assert "EDUCATION" not in short
+    assert estimate_tokens(short) <= 60
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+os.environ.setdefault("DRIVE_WEBHOOK_URL", "https://tests.invalid/webhook/drive")
+
+from benchmarks.fakes import FakeDrive
+from services import drive
+from services.role_registry import RoleRegistry
+from webhook import server
+from webhook.work_queue import BoundedSet
+
+PDF = "application/pdf"
+
+
+@pytest.fixture
+def fake_drive(monkeypatch):
+    fake = FakeDrive()
+    monkeypatch.setattr(drive, "get_service", lambda api, version: fake)
+    return fake
+
+
+@pytest.fixture
+def sync(monkeypatch):
+    """
+    server.sync_drive_changes over the Roles in `tab`, with run_folder
+    replaced by one that records {folder_id: [file names]} per sync and
+    marks every file processed.
+    """
+    tab = []
+    runs = []
+    monkeypatch.setattr(server, "role_registry", RoleRegistry(loader=lambda: list(tab), ttl=0))
+    monkeypatch.setattr(server.change_tracker, "state", mongomock.MongoClient().db.drive_state)
+    monkeypatch.setattr(server, "PROCESSED_FILES", BoundedSet(10000))
+
+    def run_folder(job, files):
+        runs[-1].setdefault(job["folder_id"], []).extend(sorted(f["name"] for f in files))
+        for f in files:
+            server.PROCESSED_FILES.add(server.processed_key(f))
+        return []
+    monkeypatch.setattr(server, "run_folder", run_folder)
+
+    def run(*folder_ids):
+        tab[:] = [{"title": f"Role {f}", "responsibilities": "", "folder_id": f} for f in folder_ids]
+        runs.append({})
+        server.sync_drive_changes()
+        return runs[-1]
+    return run
+
+
+def test_first_sync_backfills_every_page_then_only_changes(fake_drive, sync):
+    for i in range(1001):  # one more than a list page
+        fake_drive.upload("f1", f"a{i:04d}.pdf", PDF, b"%PDF")
+
+    assert len(sync("f1")["f1"]) == 1001
+
+    fake_drive.upload("f1", "new.pdf", PDF, b"%PDF")
+    fake_drive.upload("elsewhere", "other.pdf", PDF, b"%PDF")
+    assert sync("f1") == {"f1": ["new.pdf"]}
+    assert sync("f1") == {}
+
+
+def test_folder_added_after_the_first_sync_is_backfilled(fake_drive, sync):
+    fake_drive.upload("f1", "a.pdf", PDF, b"%PDF")
+    fake_drive.upload("f2", "old.pdf", PDF, b"%PDF")
+    assert sync("f1") == {"f1": ["a.pdf"]}
+
+    fake_drive.upload("f2", "new.pdf", PDF, b"%PDF")
+    assert sync("f1", "f2") == {"f2": ["new.pdf", "old.pdf"]}
+    assert sync("f1", "f2") == {}
+
+
+def test_listing_failure_holds_the_token_until_the_folder_lists(fake_drive, sync):
+    fake_drive.upload("f1", "a.pdf", PDF, b"%PDF")
+    fake_drive.upload("f2", "b.pdf", PDF, b"%PDF")
+    fake_drive.unlistable.add("f2")
+
+    assert sync("f1", "f2") == {"f1": ["a.pdf"]}
+    assert server.change_tracker.stored_token() is None
+
+    fake_drive.unlistable.clear()
+    # f1's file is already processed; f2 is listed again
+    assert sync("f1", "f2") == {"f2": ["b.pdf"]}
+    assert server.change_tracker.stored_token() is not None
@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+os.environ.setdefault("DRIVE_WEBHOOK_URL", "https://tests.invalid/webhook/drive")
+
+from benchmarks.fakes import FakeDrive
+from services import drive
+from services.drive_channels import ChannelManager
+from webhook import server
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    fake = FakeDrive()
+    monkeypatch.setattr(drive, "get_service", lambda api, version: fake)
+    manager = ChannelManager("https://tests.invalid/webhook/drive", ttl=3600, renew_before=900)
+    manager.collection = mongomock.MongoClient().db.drive_channels
+    return manager, fake
+
+
+def test_channel_close_to_expiry_is_renewed_and_the_old_one_stopped(manager):
+    manager, fake = manager
+    manager.sync(["f1", "f2"])
+    old = {doc["folder_id"]: doc["_id"] for doc in manager.channels.values()}
+
+    # f1's channel now expires within the renewal window
+    manager.channels[old["f1"]]["expiration"] = int((time.time() + 60) * 1000)
+    manager.sync(["f1", "f2"])
+
+    current = {doc["folder_id"]: doc["_id"] for doc in manager.channels.values()}
+    assert current["f1"] != old["f1"]
+    assert current["f2"] == old["f2"]
+    assert len(current) == len(manager.channels) == 2
+    assert fake.calls["drive.files.watch"] == 3
+    assert fake.calls["drive.channels.stop"] == 1
+    assert manager.collection.count_documents({}) == 2
+
+
+def test_startup_starts_the_refresh_loop(monkeypatch):
+    started = threading.Event()
+    monkeypatch.setattr(server, "refresh_roles_periodically", started.set)
+
+    server.start_periodic_refresh()
+
+    assert started.wait(5)
@@ -0,0 +1,117 @@
+import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+from pymongo.errors import DuplicateKeyError
+
+from database import mongo
+
+
+@pytest.fixture
+def results(monkeypatch):
+    collection = mongomock.MongoClient().db.results
+    monkeypatch.setattr(mongo, "mongo_results", collection)
+    return collection
+
+
+def match(name, score, email="", file_id=None, status="Review Manually"):
+    return {"name": name, "file_id": file_id, "score": score, "status": status, "email": email}
+
+
+def test_store_results_keeps_latest_per_candidate_and_job(results):
+    mongo.store_results("Data Engineer", [match("a.pdf", 40, "A@Example.com"), match("b.pdf", 55, "b@example.com")])
+    mongo.store_results("Data Engineer", [match("a2.pdf", 80, "a@example.com", status="Shortlisted")])
+    mongo.store_results("ML Engineer", [match("a.pdf", 60, "a@example.com")])
+
+    docs = {(d["email"], d["job_title"]): d for d in results.find()}
+    assert len(docs) == 3
+    latest = docs[("a@example.com", "Data Engineer")]
+    assert (latest["candidate"], latest["score"], latest["status"]) == ("a2.pdf", 80, "Shortlisted")
+
+
+def test_matches_without_email_are_keyed_by_file(results):
+    mongo.store_results("Data Engineer", [
+        match("x.pdf", 0, file_id="f1", status="Error: ResourceExhausted"),
+        match("y.pdf", 30, file_id="f2"),
+        match("z.pdf", 35),
+    ])
+    mongo.store_results("Data Engineer", [match("y.pdf", 45, file_id="f2")])
+
+    docs = {d["candidate_key"]: d for d in results.find()}
+    assert set(docs) == {"file:f1", "file:f2", "file:z.pdf"}
+    assert docs["file:f2"]["score"] == 45
+
+
+def test_ensure_indexes_dedupes_legacy_documents_and_enforces_uniqueness(results):
+    old, new = datetime.datetime(2024, 1, 1), datetime.datetime(2024, 2, 1)
+    results.insert_many([
+        {"candidate": "a.pdf", "email": "a@example.com", "job_title": "Data Engineer", "score": 10, "timestamp": old},
+        {"candidate": "a.pdf", "email": "a@example.com", "job_title": "Data Engineer", "score": 90, "timestamp": new},
+        {"candidate": "n.pdf", "email": "", "job_title": "Data Engineer", "score": 20, "timestamp": old},
+    ])
+
+    mongo.ensure_indexes()
+    mongo.ensure_indexes()
+
+    docs = list(results.find({}, {"_id": 0, "candidate_key": 1, "score": 1}))
+    assert sorted(docs, key=lambda d: d["candidate_key"]) == [
+        {"candidate_key": "a@example.com", "score": 90},
+        {"candidate_key": "file:n.pdf", "score": 20},
+    ]
+    assert results.index_information()["candidate_job_title"]["unique"]
+    with pytest.raises(DuplicateKeyError):
+        results.insert_one({"candidate_key": "a@example.com", "job_title": "Data Engineer"})
+
+
+def test_migration_only_runs_until_the_unique_index_exists(results, monkeypatch):
+    migrations = []
+    migrate = mongo.migrate_results
+    monkeypatch.setattr(mongo, "migrate_results", lambda: migrations.append(migrate()))
+
+    for _ in range(3):
+        mongo.ensure_indexes()
+
+    assert len(migrations) == 1
+
+
+def mongo_call_counts():
+    from services.metrics import registry
+
+    with registry.lock:
+        return {
+            dict(labels)["outcome"]: hist["count"]
+            for (name, labels), hist in registry.histograms.items()
+            if name == "recruitment_external_call_seconds" and dict(labels).get("api") == "mongo"
+        }
+
+
+def test_store_results_times_the_real_outcome(results, monkeypatch):
+    from pymongo.errors import AutoReconnect
+
+    before = mongo_call_counts()
+    mongo.store_results("Data Engineer", [match("a.pdf", 40, "a@example.com")])
+
+    class Down:
+        def bulk_write(self, ops, ordered=True):
+            raise AutoReconnect("primary stepped down")
+    monkeypatch.setattr(mongo, "mongo_results", Down())
+    with pytest.raises(AutoReconnect):
+        mongo.store_results("Data Engineer", [match("a.pdf", 50, "a@example.com")])
+
+    after = mongo_call_counts()
+    assert after.get("success", 0) - before.get("success", 0) == 1
+    assert after.get("transient", 0) - before.get("transient", 0) == 1
+    assert "done" not in after
+
+
+def test_pymongo_errors_are_not_classified_by_http_status():
+    from pymongo.errors import AutoReconnect, OperationFailure
+    from services.resilience import PERMANENT, THROTTLED, TRANSIENT
+
+    assert mongo.mongo_outcome(DuplicateKeyError("dup", 11000)) == PERMANENT
+    assert mongo.mongo_outcome(OperationFailure("interrupted at shutdown", 11600)) == PERMANENT
+    assert mongo.mongo_outcome(OperationFailure("request rate is large", 16500)) == THROTTLED
+    assert mongo.mongo_outcome(OperationFailure("not primary", 10107, {"errorLabels": ["RetryableWriteError"]})) == TRANSIENT
+    assert mongo.mongo_outcome(AutoReconnect("primary stepped down")) == TRANSIENT
+    assert mongo.mongo_outcome(TimeoutError()) == TRANSIENT
@@ -0,0 +1,34 @@
+from agents.prefilter import prefilter_resumes, PREFILTER_STATUS
+from benchmarks.bench_matcher import RESUME, NOT_A_RESUME
+
+NURSE = """Jane Doe
+jane.doe@example.com | +1 555 010 7777
+SUMMARY
+Registered nurse caring for patients on busy surgical wards.
+EXPERIENCE
+City Hospital, Staff Nurse  Mar 2015 - Present
+Triaged admissions, administered medication and trained new ward staff.
+EDUCATION
+BSc Nursing, 2011 - 2015
+SKILLS
+Patient care, phlebotomy, wound dressing, electronic health records
+"""
+
+
+def test_rejected_non_resumes_are_dropped_not_reported():
+    job = {
+        "title": "Data Engineer",
+        "responsibilities": "Build batch and streaming data pipelines with Python, SQL, Spark and Airflow",
+        "prefilter_threshold": 0.2,
+    }
+    parsed = [
+        {"id": "cv", "name": "cv.pdf", "text": RESUME.format(i=1, years=5)},
+        {"id": "nurse", "name": "nurse.pdf", "text": NURSE},
+        {"id": "invoice", "name": "invoice.pdf", "text": NOT_A_RESUME.format(i=2)},
+    ]
+
+    result = prefilter_resumes({"job": job, "parsed_resumes": parsed})
+
+    assert [r["id"] for r in result["shortlist"]] == ["cv"]
+    assert [(m["file_id"], m["status"]) for m in result["prefiltered"]] == [("nurse", PREFILTER_STATUS)]
+    assert result["prefiltered"][0]["email"] == "jane.doe@example.com"
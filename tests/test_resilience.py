@@ -0,0 +1,49 @@
+from services.metrics import registry
+from services.rate_limit import TokenBucket
+from services.resilience import ResiliencePolicy
+from agents import resume_matcher
+
+
+def call_seconds(api):
+    with registry.lock:
+        hists = [hist for (name, labels), hist in registry.histograms.items()
+                 if name == "recruitment_external_call_seconds" and dict(labels).get("api") == api]
+    return sum(h["sum"] for h in hists), sum(h["count"] for h in hists)
+
+
+class Model:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("reset")
+        return type("Response", (), {"text": "YES", "usage_metadata": None})()
+
+
+def test_rpm_waits_are_not_timed_as_gemini_latency(monkeypatch):
+    policy = ResiliencePolicy("gemini-rpm-test", 4)
+    monkeypatch.setitem(resume_matcher.policies, "gemini", policy)
+    limiter = TokenBucket(120, 1)  # one call per half second
+
+    for _ in range(3):
+        resume_matcher.generate(Model(), "prompt", limiter)
+
+    seconds, count = call_seconds("gemini-rpm-test")
+    assert count == 3
+    assert seconds < 0.2
+
+
+def test_every_retry_spends_its_own_token(monkeypatch):
+    policy = ResiliencePolicy("gemini-retry-test", 4, base=0.0)
+    monkeypatch.setitem(resume_matcher.policies, "gemini", policy)
+    tokens = []
+
+    class Limiter:
+        def acquire(self):
+            tokens.append(policy.limiter.in_flight)
+
+    assert resume_matcher.generate(Model(failures=2), "prompt", Limiter()) == "YES"
+    assert tokens == [0, 0, 0]  # one per attempt, none while holding a slot
@@ -0,0 +1,34 @@
+from services.role_registry import RoleRegistry
+
+
+def role(folder_id, title="Data Engineer", responsibilities="Build pipelines"):
+    return {"title": title, "responsibilities": responsibilities, "folder_id": folder_id}
+
+
+def test_listeners_get_every_reload_diff_but_not_the_initial_load():
+    tab = [role("f1"), role("f2", "ML Engineer")]
+    registry = RoleRegistry(loader=lambda: list(tab), ttl=3600)
+    diffs = []
+    registry.subscribe(diffs.append)
+
+    assert registry.by_folder("f1")["title"] == "Data Engineer"
+    assert diffs == []
+
+    tab[:] = [role("f1", responsibilities="Build and run pipelines"), role("f3", "Analyst")]
+    registry.invalidate()
+    assert registry.by_folder("f3")["title"] == "Analyst"  # a lookup, not refresh(), triggers the reload
+
+    [diff] = diffs
+    assert [r["folder_id"] for r in diff.added] == ["f3"]
+    assert [r["folder_id"] for r in diff.removed] == ["f2"]
+    assert [r["folder_id"] for r in diff.changed] == ["f1"]
+
+
+def test_failing_listener_does_not_break_lookups():
+    tab = [role("f1")]
+    registry = RoleRegistry(loader=lambda: list(tab), ttl=3600)
+    registry.subscribe(lambda diff: 1 / 0)
+    registry.roles()
+    tab.append(role("f2"))
+    registry.invalidate()
+    assert registry.by_folder("f2") is not None
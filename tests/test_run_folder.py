@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("mongomock")
+os.environ.setdefault("DRIVE_WEBHOOK_URL", "https://tests.invalid/webhook/drive")
+
+from webhook import server
+from webhook.work_queue import BoundedSet
+
+JOB = {"title": "Data Engineer", "responsibilities": "", "folder_id": "f1"}
+
+
+def drive_file(file_id, name, mime_type="application/pdf", size="1000"):
+    return {"id": file_id, "name": name, "mimeType": mime_type, "md5Checksum": file_id, "size": size}
+
+
+@pytest.fixture
+def workflow(monkeypatch):
+    """
+    A workflow that takes a moment and scores every file it is given;
+    returns the file ids of each invocation.
+    """
+    runs = []
+
+    class Workflow:
+        def invoke(self, state):
+            runs.append([r["id"] for r in state["resumes"]])
+            time.sleep(0.1)
+            matches = [{"file_id": r["id"], "name": r["name"], "score": 70, "status": "Shortlisted"}
+                       for r in state["resumes"]]
+            return {"matches": matches, "stored": True}
+    monkeypatch.setattr(server, "app_workflow", Workflow())
+    monkeypatch.setattr(server, "PROCESSED_FILES", BoundedSet(100))
+    monkeypatch.setattr(server, "FILE_ATTEMPTS", {})
+    return runs
+
+
+def test_files_skipped_for_type_or_size_are_final():
+    files = [
+        drive_file("doc", "notes", "application/vnd.google-apps.document"),
+        drive_file("img", "photo.png", "image/png"),
+        drive_file("big", "huge.pdf", size=str(10 ** 10)),
+        drive_file("cv", "cv.pdf"),
+    ]
+
+    finished = server.finished_files(files, {"matches": [], "parsed_resumes": []})
+
+    assert [f["id"] for f in finished] == ["doc", "img", "big"]
+
+
+def test_concurrent_runs_for_one_folder_score_each_file_once(workflow):
+    files = [drive_file(f"id{i}", f"cv_{i}.pdf") for i in range(3)]
+    retries = []
+    threads = [threading.Thread(target=lambda: retries.append(server.run_folder(JOB, files))) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert workflow == [["id0", "id1", "id2"]]
+    assert retries == [[], []]
+
+    server.run_folder(JOB, files, reprocess=True)
+    assert len(workflow) == 2
@@ -0,0 +1,28 @@
+import threading
+
+from benchmarks.fakes import FakeSheets
+from services import sheets
+
+
+def test_parallel_role_writes_replace_only_their_own_rows(monkeypatch):
+    fake = FakeSheets(latency=0.005)
+    monkeypatch.setattr(sheets, "get_service", lambda api, version: fake)
+    roles = [f"Role {r}" for r in "ABCD"]
+    # Two stale rows per role, interleaved so every delete shifts the others
+    for i in range(2):
+        for role in roles:
+            fake.tabs["Results"].append([f"old {role} {i}", 10, "Not Suitable", f"c{i}@example.com", role])
+
+    def write(role):
+        sheets.write_results_to_results_tab(role, [
+            {"name": f"new {role} {i}", "score": 80, "status": "Shortlisted", "email": f"c{i}@example.com"}
+            for i in range(2)
+        ])
+    threads = [threading.Thread(target=write, args=(role,)) for role in roles]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    names = sorted(row[0] for row in fake.tabs["Results"][1:])
+    assert names == sorted(f"new {role} {i}" for role in roles for i in range(2))
@@ -0,0 +1,49 @@
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from agents import skills
+
+LISTENER_NER = {
+    "model": {
+        "@architectures": "spacy.TransitionBasedParser.v2",
+        "state_type": "ner",
+        "extra_state_tokens": False,
+        "hidden_width": 64,
+        "maxout_pieces": 2,
+        "use_upper": True,
+        "tok2vec": {"@architectures": "spacy.Tok2VecListener.v1", "width": 96, "upstream": "*"},
+    },
+}
+
+
+def save_model(path, ner_config=None):
+    nlp = spacy.blank("en")
+    nlp.add_pipe("tok2vec")
+    nlp.add_pipe("ner", config=ner_config or {}).add_label("SKILL")
+    nlp.add_pipe("sentencizer", name="senter")
+    nlp.initialize()
+    nlp.to_disk(path)
+    return str(path)
+
+
+@pytest.fixture
+def load(monkeypatch):
+    def load(path):
+        monkeypatch.setattr(skills, "nlp", None)
+        monkeypatch.setattr(skills, "SKILL_NER_MODEL", path)
+        return skills.get_pipeline()[0]
+    return load
+
+
+def test_shared_tok2vec_kept_when_ner_listens_to_it(tmp_path, load):
+    pipeline = load(save_model(tmp_path / "listener", LISTENER_NER))
+
+    assert pipeline.pipe_names == ["tok2vec", "ner"]
+    assert pipeline.get_pipe("tok2vec").listening_components == ["ner"]
+
+
+def test_unused_tok2vec_dropped_when_ner_has_its_own(tmp_path, load):
+    pipeline = load(save_model(tmp_path / "standalone"))
+
+    assert pipeline.pipe_names == ["ner"]
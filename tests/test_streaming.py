@@ -0,0 +1,123 @@
+import time
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from benchmarks.fakes import FakeSheets
+from services import sheets
+from workflows import streaming
+
+JOB = {"title": "Data Engineer", "responsibilities": "Build data pipelines", "folder_id": "f1"}
+
+
+class ParsedStore:
+    """Every file is already parsed, so the pipeline never downloads."""
+
+    def get(self, key):
+        return {"text": f"Data engineer building pipelines ({key})", "skills": []}
+
+    def set(self, key, value):
+        pass
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """
+    stream_resumes over six stored resumes in micro-batches of two, with
+    scoring and both writers recorded; `fail` holds the stages to break.
+    """
+    calls = {"fail": set(), "prefilter": [], "sheets": [], "mongo": []}
+    monkeypatch.setattr(streaming, "parsed_store", ParsedStore())
+    monkeypatch.setattr(streaming.genai, "GenerativeModel", lambda *args, **kwargs: None)
+    micro_batches = streaming.micro_batches
+    monkeypatch.setattr(streaming, "micro_batches", lambda inbox: micro_batches(inbox, size=2, wait=0.05))
+
+    monkeypatch.setattr(streaming, "split_near_duplicates", lambda resumes, job: (resumes, [], resumes))
+    monkeypatch.setattr(streaming, "record_near_duplicates", lambda resumes, job: None)
+
+    def prefilter(state):
+        calls["prefilter"].append(state["job"].get("prefilter_top_k"))
+        return {"shortlist": state["parsed_resumes"], "prefiltered": []}
+    monkeypatch.setattr(streaming, "prefilter_resumes", prefilter)
+
+    def score(to_score, job, model):
+        if "score" in calls["fail"]:
+            raise RuntimeError("Gemini down")
+        return [{"name": r["name"], "file_id": r["id"], "score": 80, "status": "Shortlisted"} for r in to_score]
+    monkeypatch.setattr(streaming, "score_resumes", score)
+
+    def writer(kind):
+        def write(title, matches, replaceable=None):
+            if kind in calls["fail"]:
+                raise RuntimeError(f"{kind} down")
+            calls[kind].extend(m["file_id"] for m in matches)
+        return write
+    monkeypatch.setattr(streaming, "write_results_to_results_tab", writer("sheets"))
+    monkeypatch.setattr(streaming, "store_results", writer("mongo"))
+    monkeypatch.setattr(streaming, "results_row_counts", lambda title: Counter())
+
+    files = [{"id": f"id{i}", "name": f"cv_{i}.pdf", "md5Checksum": str(i)} for i in range(6)]
+
+    def run(job=JOB):
+        return streaming.stream_resumes({"job": job, "resumes": files})
+    calls["run"] = run
+    return calls
+
+
+def test_every_batch_written_to_both_stores(pipeline):
+    result = pipeline["run"]({**JOB, "prefilter_top_k": 3})
+
+    assert result["stored"] is True
+    assert sorted(pipeline["sheets"]) == sorted(pipeline["mongo"]) == [f"id{i}" for i in range(6)]
+    assert len(pipeline["prefilter"]) >= 3
+    assert set(pipeline["prefilter"]) == {0}  # top-K is not applied per batch
+
+
+def test_sheets_failure_still_writes_mongo_and_raises(pipeline):
+    pipeline["fail"].add("sheets")
+
+    with pytest.raises(RuntimeError, match="6 results not written"):
+        pipeline["run"]()
+    assert sorted(pipeline["mongo"]) == [f"id{i}" for i in range(6)]
+
+
+def test_mongo_failure_leaves_storing_to_the_caller(pipeline):
+    pipeline["fail"].add("mongo")
+
+    result = pipeline["run"]()
+
+    assert result["stored"] is False
+    assert len(result["matches"]) == 6
+
+
+def test_failed_scoring_batch_raises(pipeline):
+    pipeline["fail"].add("score")
+
+    with pytest.raises(RuntimeError, match="6 resumes not scored"):
+        pipeline["run"]()
+
+
+def test_later_flushes_keep_email_less_rows_of_earlier_ones(pipeline, monkeypatch):
+    fake = FakeSheets()
+    fake.tabs["Results"] += [
+        ["old.pdf", 0, "Error: Timeout", "", JOB["title"]],
+        ["other.pdf", 50, "Review Manually", "", "Analyst"],
+    ]
+    monkeypatch.setattr(sheets, "get_service", lambda api, version: fake)
+    monkeypatch.setattr(streaming, "write_results_to_results_tab", sheets.write_results_to_results_tab)
+    monkeypatch.setattr(streaming, "results_row_counts", sheets.results_row_counts)
+    score = streaming.score_resumes
+
+    def slow_score(to_score, job, model):
+        time.sleep(0.1)  # so each batch reaches the writer as its own flush
+        return score(to_score, job, model)
+    monkeypatch.setattr(streaming, "score_resumes", slow_score)
+
+    pipeline["run"]()
+
+    rows = fake.tabs["Results"][1:]
+    assert sorted(row[0] for row in rows if row[4] == JOB["title"]) == [f"cv_{i}.pdf" for i in range(6)]
+    assert [row[0] for row in rows if row[4] == "Analyst"] == ["other.pdf"]
+    assert fake.calls["sheets.spreadsheets.values.append"] >= 2  # written in several flushes
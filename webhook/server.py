@@ -1,29 +1,28 @@
 import os
-import uuid
 from fastapi import FastAPI, Request, Header
-from fastapi.responses import JSONResponse
-from googleapiclient.discovery import build
-from services.auth import get_google_credentials
+from fastapi.responses import JSONResponse, PlainTextResponse
+from services.drive import file_ref, list_resumes
+from agents.resume_parser import is_supported, too_large
+from services.drive_changes import DriveChangeTracker
+from services.drive_channels import ChannelManager
 from workflows.recruitment_graph import build_graph
+from workflows.batch_runner import run_roles, format_summary
+from workflows.resume_major import run_resume_major
 from dotenv import load_dotenv
-from services.sheets import read_job_role, write_results_to_results_tab
-import uuid
-from database.mongo import store_result
-import traceback
+from services.role_registry import RoleRegistry
+from database.mongo import ensure_indexes, store_results
+from webhook.work_queue import BoundedSet, DebouncedWorkQueue
+from services.resilience import pause_seconds, policies
+from services import metrics
+from config.logging_setup import setup_logging
+from config.settings import (
+    WORK_QUEUE_WORKERS, WORK_QUEUE_DEBOUNCE_SECONDS, PROCESSED_FILES_MAX, FILE_MAX_ATTEMPTS, RUN_MODE,
+)
 import logging
+import uuid
 
 
-# Setup logging
-log_dir = ".logs"
-os.makedirs(log_dir, exist_ok=True)
-log_path = os.path.join(log_dir, "webhook.log")
-logging.basicConfig(
-    filename=log_path,
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-
+setup_logging("webhook.log")
 load_dotenv()
 
 DRIVE_WEBHOOK_URL = os.getenv("DRIVE_WEBHOOK_URL")
@@ -33,117 +32,290 @@ if not DRIVE_WEBHOOK_URL:
 
 app = FastAPI()
 app_workflow = build_graph()
+role_registry = RoleRegistry()
 
 def get_files_in_folder(folder_id):
+    """
+    Every resume file (RESUME_MIME_TYPES, as the changes feed delivers) in
+    `folder_id`. Listing errors propagate so callers do not mistake a failed
+    listing for an empty folder.
+    """
     logging.info(f"Fetching files in folder: {folder_id}")
     try:
-        creds = get_google_credentials()
-        drive = build("drive", "v3", credentials=creds)
-        results = drive.files().list(
-            q=f"'{folder_id}' in parents and trashed = false",
-            orderBy="createdTime desc"
-        ).execute()
-        logging.info("Files fetched successfully from folder.")
-        return results.get("files", [])
+        files = list_resumes(folder_id)
     except Exception as e:
         logging.error(f"Error fetching files in folder {folder_id}: {e}", exc_info=True)
-        return []
+        raise
+    logging.info("Fetched %d files from folder.", len(files))
+    return files
 
 
 def process_all_roles():
-    logging.info("Starting process_all_roles")
+    """
+    Full sweep of every role folder, several roles at a time, or resume-major
+    when RUN_MODE is "resume".
+    """
+    logging.info("Starting process_all_roles (%s mode)", RUN_MODE)
     try:
-        roles = read_job_role()
-        for role in roles:
-            folder_id = role["folder_id"]
-            job_title = role["title"]
-            files = get_files_in_folder(folder_id)
-            if not files:
-                logging.info(f"No resumes found for job title: {job_title}")
-                continue
-            state = {
-                "job": {
-                    "title": role["title"],
-                    "responsibilities": role["responsibilities"],
-                    "folder_id": role["folder_id"],
-                },
-                "resumes": [{"id": f["id"], "name": f["name"]} for f in files],
-                "culture": "",
-                "parsed_resumes": [],
-                "matches": []
-            }
-            try:
-                result = app_workflow.invoke(state)
-                matches = result.get("matches", [])
-                if matches and isinstance(matches, list) and matches and isinstance(matches[0], list):
-                    matches = [
-                        {"name": m[0], "score": m[1], "status": m[2], "email": m[3]}
-                        for m in matches
-                    ]
-                elif matches and isinstance(matches, list) and matches and isinstance(matches[0], dict):
-                    pass
-                else:
-                    logging.warning(f"Matches format unexpected for job title {job_title}: {matches}")
-                write_results_to_results_tab(job_title, matches)
-            except Exception as e:
-                logging.error(f"Error processing role {job_title}: {e}", exc_info=True)
-        logging.info("Finished process_all_roles")
+        if RUN_MODE == "resume":
+            summaries = run_resume_major(role_registry.roles())
+            logging.info("Finished process_all_roles (resume-major)\n%s", format_summary(summaries))
+            return
+        run_id, summaries = run_roles(role_registry.roles())
+        logging.info("Finished process_all_roles (run %s)\n%s", run_id, format_summary(summaries))
     except Exception as e:
         logging.error(f"Error in process_all_roles: {e}", exc_info=True)
 
-channel_to_folder = {}
-
-def register_webhook_for_subfolder(folder_id, webhook_url):
-    try:
-        creds = get_google_credentials()
-        drive = build("drive", "v3", credentials=creds)
-        channel_id = str(uuid.uuid4())
-        body = {
-            "id": channel_id,
-            "type": "webhook",
-            "address": webhook_url,
-        }
-        watch = drive.files().watch(fileId=folder_id, body=body).execute()
-        logging.info(f"Registered webhook for subfolder {folder_id}: Channel ID {watch.get('id')}")
-        channel_to_folder[watch["id"]] = folder_id
-    except Exception as e:
-        logging.error(f"Error registering webhook for folder {folder_id}: {e}", exc_info=True)
+channel_manager = ChannelManager(DRIVE_WEBHOOK_URL)
 
 import threading
 import time
 
 def refresh_roles_periodically(interval=60):
     """
-    Periodically refresh roles and register webhooks for new folders.
+    Periodically refresh roles, keep one live webhook channel per role folder
+    and process Drive changes.
     """
     while True:
         logging.info("Refreshing roles and registering webhooks...")
         try:
-            roles = read_job_role()
-            for role in roles:
-                folder_id = role["folder_id"]
-                register_webhook_for_subfolder(folder_id, DRIVE_WEBHOOK_URL)
-            process_all_roles()
+            channel_manager.sync(role["folder_id"] for role in role_registry.roles())
+            sync_drive_changes()
         except Exception as e:
             logging.error(f"Error during periodic refresh: {e}", exc_info=True)
         time.sleep(interval)
 
+@app.on_event("startup")
+def create_mongo_indexes():
+    try:
+        ensure_indexes()
+        logging.info("MongoDB indexes ensured at startup.")
+    except Exception as e:
+        logging.error(f"Error creating MongoDB indexes at startup: {e}", exc_info=True)
+
 @app.on_event("startup")
 def register_all_subfolder_webhooks():
     """
-    Register a Drive push notification channel (watch) for each subfolder at startup.
+    Restore persisted Drive push notification channels and register a watch
+    for each subfolder that has none at startup.
     """
     try:
-        roles = read_job_role()
-        for role in roles:
-            folder_id = role["folder_id"]
-            register_webhook_for_subfolder(folder_id, DRIVE_WEBHOOK_URL)
+        channel_manager.load()
+        channel_manager.sync(role["folder_id"] for role in role_registry.roles())
         logging.info("All subfolder webhooks registered at startup.")
     except Exception as e:
         logging.error(f"Error registering subfolder webhooks at startup: {e}", exc_info=True)
 
+@app.on_event("startup")
+def start_periodic_refresh():
+    """
+    Renew channels before their TTL runs out, stop those of removed roles and
+    catch up on Drive changes, in the background for the server's lifetime.
+    """
+    threading.Thread(target=refresh_roles_periodically, name="refresh-roles", daemon=True).start()
+
 from fastapi import Body
 
+def processed_key(file):
+    return file["id"], file.get("md5Checksum") or file.get("modifiedTime")
+
+def merge_folder_work(old, new):
+    return {
+        "job": new.get("job") or old.get("job"),
+        "register": old.get("register") or new.get("register"),
+        "reprocess": old.get("reprocess") or new.get("reprocess"),
+    }
+
+def role_job(role):
+    # Carries title, responsibilities, folder_id and any per-role settings
+    return dict(role)
+
+def finished_files(files, result):
+    """
+    Files that reached a final outcome in a workflow result: a score or
+    status other than an "Error: ..." row, parsed and judged not to be a
+    resume, or skipped for their type or size, which retrying cannot change.
+    Download, parse and Gemini failures are left out for a retry.
+    """
+    matches = result.get("matches", [])
+    errored = {m.get("file_id") for m in matches if str(m.get("status", "")).startswith("Error")}
+    done = {m.get("file_id") for m in matches} | {r.get("id") for r in result.get("parsed_resumes", [])}
+    return [f for f in files if f["id"] in done - errored or not is_supported(f) or too_large(f)]
+
+def settle_unfinished(files):
+    """
+    Count another failed attempt for each of `files` and return those still
+    worth retrying; files out of attempts are marked processed so they stop
+    holding the changes token.
+    """
+    retry = []
+    with attempts_lock:
+        for f in files:
+            key = processed_key(f)
+            FILE_ATTEMPTS[key] = FILE_ATTEMPTS.get(key, 0) + 1
+            if FILE_ATTEMPTS[key] < FILE_MAX_ATTEMPTS:
+                retry.append(f)
+                continue
+            del FILE_ATTEMPTS[key]
+            PROCESSED_FILES.add(key)
+            logging.warning("Giving up on %s after %d attempts", f.get("name"), FILE_MAX_ATTEMPTS)
+    return retry
+
+def folder_lock(folder_id):
+    with folder_locks_lock:
+        return folder_locks.setdefault(folder_id, threading.Lock())
+
+def run_folder(job, files, reprocess=False):
+    """
+    Run the workflow over `files` for one role and store the matches.
+    Returns the files that did not finish and should be retried.
+
+    Runs for one folder (the changes sync and that folder's own queue key)
+    take turns, and files a previous run finished are dropped unless
+    `reprocess` is set, so no file is scored twice concurrently.
+    """
+    with folder_lock(job["folder_id"]):
+        if not reprocess:
+            files = [f for f in files if processed_key(f) not in PROCESSED_FILES]
+        if not files:
+            return []
+        return run_folder_files(job, files)
+
+def run_folder_files(job, files):
+    logging.info(f"Processing {len(files)} files for job title {job['title']} in folder {job['folder_id']}")
+    state = {
+        "job": job,
+        "resumes": [file_ref(f) for f in files],
+        "culture": "",
+        "parsed_resumes": [],
+        "matches": [],
+        "trace_id": uuid.uuid4().hex[:12]
+    }
+    # The OutputResults node already writes the Results tab; the streaming
+    # pipeline writes Mongo as well
+    result = app_workflow.invoke(state)
+    if not result.get("stored"):
+        store_results(job["title"], result.get("matches", []))
+    finished = finished_files(files, result)
+    with attempts_lock:
+        for f in finished:
+            FILE_ATTEMPTS.pop(processed_key(f), None)
+            PROCESSED_FILES.add(processed_key(f))
+    done = {f["id"] for f in finished}
+    unfinished = [f for f in files if f["id"] not in done]
+    if unfinished:
+        logging.warning("%d of %d files for %s did not finish and will be retried",
+                        len(unfinished), len(files), job["title"])
+    return settle_unfinished(unfinished)
+
+def process_folder(folder_id, payload):
+    """
+    Work queue handler for one folder: run the workflow over its files not
+    yet processed (every file when `reprocess` is set).
+    """
+    if payload.get("register"):
+        channel_manager.ensure(folder_id)
+
+    job = payload.get("job")
+    if not job:
+        role = role_registry.by_folder(folder_id)
+        if not role:
+            logging.warning("No matching job title found for folder: %s", folder_id)
+            return
+        job = role_job(role)
+
+    files = get_files_in_folder(folder_id)
+    if not payload.get("reprocess"):
+        files = [f for f in files if processed_key(f) not in PROCESSED_FILES]
+    if not files:
+        logging.info("No new files to process for job title: %s", job["title"])
+        return
+    run_folder(job, files, reprocess=payload.get("reprocess"))
+
+change_tracker = DriveChangeTracker()
+sync_lock = threading.Lock()
+
+def sync_drive_changes():
+    """
+    Process resume files added or modified in any role folder since the last
+    sync, via the Drive changes feed. Folders the stored token does not
+    cover (every folder on the first sync, later any folder added to the
+    Roles tab) are backfilled with a full listing. The page token is only
+    advanced when every folder succeeded, so failures are retried on the
+    next sync.
+    """
+    with sync_lock:
+        folders = {role["folder_id"]: role for role in role_registry.roles()}
+        changed, token = change_tracker.poll(folders)
+        if changed is None:
+            logging.info("No Drive change token stored; backfilling %d role folders.", len(folders))
+            changed, backfill = {}, set(folders)
+        else:
+            backfill = change_tracker.unsynced(folders)
+            if backfill:
+                logging.info("Backfilling %d role folders added since the last sync.", len(backfill))
+
+        failed = False
+        for folder_id in sorted(set(changed) | backfill):
+            try:
+                files = changed.get(folder_id, [])
+                if folder_id in backfill:
+                    files = list({f["id"]: f for f in files + get_files_in_folder(folder_id)}.values())
+                files = [f for f in files if processed_key(f) not in PROCESSED_FILES]
+                # Holding the token re-delivers unfinished files next sync
+                if files and run_folder(role_job(folders[folder_id]), files):
+                    failed = True
+            except Exception as e:
+                failed = True
+                logging.error(f"Error processing changes for folder {folder_id}: {e}", exc_info=True)
+        if not failed:
+            change_tracker.commit(token, folders)
+
+# Every Drive notification maps to one queue key: a single changes sync
+# covers all folders, so bursts across folders coalesce too.
+DRIVE_CHANGES_KEY = "drive-changes"
+
+def handle_work(key, payload):
+    if key == DRIVE_CHANGES_KEY:
+        sync_drive_changes()
+    else:
+        process_folder(key, payload)
+
+# Files already scored, keyed by (file id, checksum), and failed attempts
+# per file not yet finished
+PROCESSED_FILES = BoundedSet(PROCESSED_FILES_MAX)
+FILE_ATTEMPTS = {}
+attempts_lock = threading.Lock()
+folder_locks = {}
+folder_locks_lock = threading.Lock()
+work_queue = DebouncedWorkQueue(
+    handle_work,
+    workers=WORK_QUEUE_WORKERS,
+    debounce=WORK_QUEUE_DEBOUNCE_SECONDS,
+    merge=merge_folder_work,
+    pause=pause_seconds,  # hold new work while Gemini/Drive/Sheets are tripped
+)
+
+def on_roles_changed(diff):
+    """
+    React to Roles tab edits, whichever lookup picked them up: watch and
+    backfill added folders, rescore folders whose role changed (cached
+    verdicts make an unchanged description free) and stop watching removed
+    folders.
+    """
+    for role in diff.added:
+        work_queue.submit(role["folder_id"], {"job": role_job(role), "register": True})
+    for role in diff.changed:
+        work_queue.submit(role["folder_id"], {"job": role_job(role), "register": True, "reprocess": True})
+    for role in diff.removed:
+        channel_manager.unwatch(role["folder_id"])
+
+role_registry.subscribe(on_roles_changed)
+
+@app.on_event("startup")
+def start_work_queue():
+    work_queue.start()
+
 @app.post("/refresh_roles")
 async def refresh_roles(payload: dict = Body(...)):
     logging.info("Received /refresh_roles POST request.")
@@ -155,43 +327,14 @@ async def refresh_roles(payload: dict = Body(...)):
         logging.warning("Missing folder_id, title, or responsibilities in payload.")
         return {"status": "error", "message": "Missing folder_id, title, or responsibilities in payload"}
 
-    try:
-        if folder_id not in channel_to_folder.values():
-            register_webhook_for_subfolder(folder_id, DRIVE_WEBHOOK_URL)
-
-        files = get_files_in_folder(folder_id)
-        if not files:
-            logging.info(f"No resumes found for job title: {job_title}")
-            return {"status": f"No resumes found for {job_title}"}
-
-        for file in files:
-            logging.info(f"Processing file for job title {job_title}: File ID {file['id']}")
-            state = {
-                "job": {
-                    "title": job_title,
-                    "responsibilities": responsibilities,
-                    "folder_id": folder_id,
-                },
-                "resumes": [{"id": file["id"], "name": file["name"]}],
-                "culture": "",
-                "parsed_resumes": [],
-                "matches": []
-            }
-            try:
-                result = app_workflow.invoke(state)
-                matches = result.get("matches", [])
-                write_results_to_results_tab(job_title, matches)
-                for match in matches:
-                    store_result(job_title, match)
-            except Exception as e:
-                logging.error(f"Error processing file {file['id']} for job {job_title}: {e}", exc_info=True)
-
-        return {"status": f"Processed all files for {job_title}"}
-    except Exception as e:
-        logging.error(f"Error in /refresh_roles endpoint: {e}", exc_info=True)
-        return {"status": "error", "message": str(e)}
-
-PROCESSED_FILES = set()
+    # The caller has just edited the Roles tab
+    role_registry.invalidate()
+    job = {"title": job_title, "responsibilities": responsibilities, "folder_id": folder_id}
+    for key in ("prefilter_threshold", "prefilter_top_k"):
+        if payload.get(key) is not None:
+            job[key] = payload[key]
+    work_queue.submit(folder_id, {"job": job, "register": True, "reprocess": True})
+    return JSONResponse(content={"status": f"Queued all files for {job_title}"}, status_code=202)
 
 @app.post("/webhook/drive")
 async def google_drive_webhook(
@@ -208,60 +351,23 @@ async def google_drive_webhook(
         logging.info("Webhook event ignored: Not a new file upload or update.")
         return JSONResponse(content={"status": "ignored"})
 
-    try:
-        folder_id = channel_to_folder.get(x_goog_channel_id)
-        if not folder_id:
-            logging.warning("No matching folder found for webhook event: Channel ID %s", x_goog_channel_id)
-            return JSONResponse(content={"status": "no matching folder"})
-
-        roles = read_job_role()
-        job_title = None
-        for role in roles:
-            if role["folder_id"] == folder_id:
-                job_title = role["title"]
-                break
-
-        if not job_title:
-            logging.warning("No matching job title found for folder: %s", folder_id)
-            return JSONResponse(content={"status": "no matching job title"})
-
-        creds = get_google_credentials()
-        drive = build("drive", "v3", credentials=creds)
-        results = drive.files().list(
-            q=f"'{folder_id}' in parents and trashed = false",
-            orderBy="createdTime desc",
-            pageSize=1
-        ).execute()
-        files = results.get("files", [])
-        if not files:
-            logging.info("No files found in folder: %s", folder_id)
-            return JSONResponse(content={"status": "no files in folder"})
-
-        latest_file = files[0]
-        logging.info(f"Processing latest file for job title {job_title}: File ID {latest_file['id']}")
-
-        state = {
-            "job": {
-                "title": job_title,
-                "responsibilities": next(role["responsibilities"] for role in roles if role["folder_id"] == folder_id),
-                "folder_id": folder_id,
-            },
-            "resumes": [{"id": latest_file["id"], "name": latest_file["name"]}],
-            "culture": "",
-            "parsed_resumes": [],
-            "matches": []
-        }
-        try:
-            result = app_workflow.invoke(state)
-            matches = result.get("matches", [])
-            write_results_to_results_tab(job_title, matches)
-            for match in matches:
-                store_result(job_title, match)
-            logging.info("Processed latest file for job title: %s", job_title)
-            return JSONResponse(content={"status": "processed latest file"})
-        except Exception as e:
-            logging.error(f"Error processing latest file for job {job_title}: {e}", exc_info=True)
-            return JSONResponse(content={"status": "error", "error": str(e)}, status_code=500)
-    except Exception as e:
-        logging.error(f"Error in webhook handler: {e}", exc_info=True)
-        return JSONResponse(content={"status": "error", "error": str(e)}, status_code=500)
\ No newline at end of file
+    folder_id = channel_manager.folder_for(x_goog_channel_id)
+    if not folder_id:
+        logging.warning("No matching folder found for webhook event: Channel ID %s", x_goog_channel_id)
+        return JSONResponse(content={"status": "no matching folder"})
+
+    work_queue.submit(DRIVE_CHANGES_KEY, {})
+    return JSONResponse(content={"status": "queued"}, status_code=202)
+
+@app.get("/queue")
+async def queue_stats():
+    return {
+        **work_queue.snapshot(),
+        "processed_files": len(PROCESSED_FILES),
+        "apis": {name: policy.snapshot() for name, policy in policies.items()},
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    # Prometheus text exposition format 0.0.4
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
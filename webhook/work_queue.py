@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class BoundedSet:
+    """
+    Thread-safe set that forgets its oldest members beyond `max_size`.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, item):
+        with self.lock:
+            if item in self.items:
+                self.items.move_to_end(item)
+                return True
+            return False
+
+    def add(self, item):
+        with self.lock:
+            self.items[item] = None
+            self.items.move_to_end(item)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+
+class DebouncedWorkQueue:
+    """
+    Keyed work queue drained by a pool of worker threads.
+
+    Work submitted under a key that is already waiting is merged into the
+    waiting item (via `merge(old_payload, new_payload)`) instead of queued
+    again, and an item only becomes runnable `debounce` seconds after it was
+    first submitted, so a burst of notifications for one folder costs one
+    run. A key is never processed by two workers at once; work that arrives
+    while its key is running waits for the next round. `pause`, if given,
+    returns how many seconds workers should hold off before taking new work
+    (e.g. while a downstream circuit breaker is open).
+    """
+
+    def __init__(self, handler, workers=2, debounce=5.0, merge=None, pause=None):
+        self.handler = handler
+        self.pause = pause
+        self.workers = workers
+        self.debounce = debounce
+        self.merge = merge or (lambda old, new: new)
+        self.pending = {}
+        self.running = set()
+        self.cond = threading.Condition()
+        self.threads = []
+        self.stats = {"submitted": 0, "coalesced": 0, "processed": 0, "failed": 0, "paused_seconds": 0.0,
+                      "last_lag_seconds": 0.0}
+
+    def start(self):
+        with self.cond:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"work-queue-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        logging.info("Work queue started with %d workers (debounce %.1fs)", self.workers, self.debounce)
+
+    def submit(self, key, payload):
+        now = time.time()
+        with self.cond:
+            self.stats["submitted"] += 1
+            item = self.pending.get(key)
+            if item:
+                item["payload"] = self.merge(item["payload"], payload)
+                self.stats["coalesced"] += 1
+            else:
+                self.pending[key] = {"payload": payload, "enqueued_at": now, "due_at": now + self.debounce}
+            self.cond.notify()
+
+    def _next_ready(self):
+        """Pop the oldest due item whose key is idle; otherwise return how long to wait."""
+        now = time.time()
+        ready = [(item["due_at"], key) for key, item in self.pending.items() if key not in self.running]
+        if not ready:
+            return None, None
+        due_at, key = min(ready)
+        if due_at > now:
+            return None, due_at - now
+        return (key, self.pending.pop(key)), None
+
+    def _hold(self):
+        delay = self.pause() if self.pause else 0
+        while delay > 0:
+            logging.info("Work queue paused for %.1fs", delay)
+            with self.cond:
+                self.stats["paused_seconds"] += delay
+            time.sleep(delay)
+            delay = self.pause()
+
+    def _work(self):
+        while True:
+            self._hold()
+            with self.cond:
+                entry, wait = self._next_ready()
+                while entry is None:
+                    self.cond.wait(timeout=wait)
+                    entry, wait = self._next_ready()
+                key, item = entry
+                self.running.add(key)
+                self.stats["last_lag_seconds"] = time.time() - item["enqueued_at"]
+
+            try:
+                self.handler(key, item["payload"])
+                outcome = "processed"
+            except Exception as e:
+                logging.error(f"Work queue item {key} failed: {e}", exc_info=True)
+                outcome = "failed"
+
+            with self.cond:
+                self.running.discard(key)
+                self.stats[outcome] += 1
+                self.cond.notify_all()
+
+    def snapshot(self):
+        now = time.time()
+        with self.cond:
+            oldest = min((item["enqueued_at"] for item in self.pending.values()), default=None)
+            return {
+                "depth": len(self.pending),
+                "in_flight": len(self.running),
+                "oldest_pending_seconds": round(now - oldest, 3) if oldest else 0.0,
+                **self.stats,
+            }
@@ -0,0 +1,110 @@
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from workflows.recruitment_graph import build_graph
+from database.mongo import store_results
+from config.settings import ROLE_PARALLELISM, CHECKPOINT_DB
+
+
+def initial_state(role):
+    return {
+        # Carries title, responsibilities, folder_id and any per-role settings
+        "job": dict(role),
+        "culture": "",
+        "resumes": [],
+        "parsed_resumes": [],
+        "matches": [],
+        "trace_id": uuid.uuid4().hex[:12]
+    }
+
+def open_checkpointer(path=CHECKPOINT_DB):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+def prune_run(checkpointer, run_id, roles):
+    """
+    Delete the checkpoints of every role thread in `run_id`.
+    """
+    for role in roles:
+        checkpointer.delete_thread(f"{run_id}:{role['folder_id']}")
+    logging.info("Pruned checkpoints of completed run %s", run_id)
+
+def summarize(role, values, outcome, seconds):
+    matches = values.get("matches", [])
+    return {
+        "title": role["title"],
+        "outcome": outcome,
+        "seconds": round(seconds, 2),
+        "files": len(values.get("resumes", [])),
+        "parsed": len(values.get("parsed_resumes", [])),
+        "scored": len(matches),
+        "shortlisted": sum(1 for m in matches if m.get("status") == "Shortlisted"),
+        "errors": sum(1 for m in matches if str(m.get("status", "")).startswith("Error")),
+    }
+
+def run_role(graph, role, run_id):
+    """
+    Run (or resume) one role under the thread id `<run_id>:<folder_id>`.
+    A role that already finished in this run is reported, not rerun.
+    """
+    config = {"configurable": {"thread_id": f"{run_id}:{role['folder_id']}"}}
+    start = time.perf_counter()
+    try:
+        snapshot = graph.get_state(config)
+        if snapshot.values and not snapshot.next:
+            return summarize(role, snapshot.values, "already done", 0)
+        if snapshot.next:
+            logging.info("Resuming role %s at %s", role["title"], snapshot.next)
+            values, outcome = graph.invoke(None, config), "resumed"
+        else:
+            values, outcome = graph.invoke(initial_state(role), config), "done"
+        if not values.get("stored"):
+            store_results(role["title"], values.get("matches", []))
+        return summarize(role, values, outcome, time.perf_counter() - start)
+    except Exception as e:
+        logging.error(f"Error processing role {role['title']}: {e}", exc_info=True)
+        return summarize(role, {}, f"failed: {type(e).__name__}", time.perf_counter() - start)
+
+def completed(summary):
+    return not summary["outcome"].startswith("failed")
+
+def run_roles(roles, parallelism=ROLE_PARALLELISM, run_id=None, checkpointer=None):
+    """
+    Run every role through the workflow, `parallelism` roles at a time,
+    checkpointing after each node. Passing the `run_id` of an interrupted run
+    resumes it; completed nodes are not repeated, and the parsed-document and
+    verdict caches keep finished resumes from being downloaded or scored again.
+    Once every role has finished the run's checkpoints are deleted; a run with
+    failed roles keeps them until it is resumed to completion.
+    Returns (run_id, per-role summaries in role order).
+    """
+    run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    owned = checkpointer is None
+    checkpointer = checkpointer or open_checkpointer()
+    try:
+        graph = build_graph(checkpointer=checkpointer)
+        logging.info("Batch run %s: %d roles, parallelism %d", run_id, len(roles), parallelism)
+        with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="role") as pool:
+            summaries = list(pool.map(lambda role: run_role(graph, role, run_id), roles))
+        if all(completed(s) for s in summaries):
+            prune_run(checkpointer, run_id, roles)
+    finally:
+        if owned:
+            checkpointer.conn.close()
+    return run_id, summaries
+
+def format_summary(summaries):
+    header = f"{'Role':<32} {'Outcome':<18} {'Secs':>8} {'Files':>6} {'Parsed':>6} {'Scored':>6} {'Short':>6} {'Errors':>6}"
+    lines = [header, "-" * len(header)]
+    for s in summaries:
+        lines.append(
+            f"{s['title'][:32]:<32} {s['outcome'][:18]:<18} {s['seconds']:>8.2f} {s['files']:>6} "
+            f"{s['parsed']:>6} {s['scored']:>6} {s['shortlisted']:>6} {s['errors']:>6}"
+        )
+    return "\n".join(lines)
@@ -6,8 +6,13 @@ from agents.job_loader       import load_job_role
 from agents.culture_loader   import load_culture_doc
 from agents.resume_fetcher   import get_resume_files
 from agents.resume_parser    import parse_resume
+from agents.prefilter        import prefilter_resumes
+from agents.condenser        import condense_resumes
 from agents.resume_matcher   import match_resumes
 from agents.result_writer    import output_results
+from workflows.streaming      import stream_resumes
+from services.metrics         import instrument_node
+from config.settings          import STREAMING_PIPELINE
 
 # Define the schema for the workflow state
 class StateSchema(TypedDict):
@@ -15,20 +20,42 @@ class StateSchema(TypedDict):
     culture: str
     resumes: list
     parsed_resumes: list
+    shortlist: list
+    prefiltered: list
     matches: list
+    stored: bool
+    trace_id: str  # optional; tags every log line a node writes
 
-def build_graph():
+def node(name, fn):
+    # Every node is timed into recruitment_node_seconds and logs under the run's trace id
+    return RunnableLambda(instrument_node(name, fn))
+
+def build_graph(checkpointer=None, streaming=STREAMING_PIPELINE):
     # Create a new stateful workflow graph with the defined schema
     wf = StateGraph(state_schema=StateSchema)
     
+    if streaming:
+        # One node runs fetch/parse/score/write as an overlapping pipeline and
+        # flushes results to Sheets and Mongo itself
+        wf.add_node("LoadJobRole",   node("LoadJobRole", load_job_role))
+        wf.add_node("LoadCulture",   node("LoadCulture", load_culture_doc))
+        wf.add_node("StreamResumes", node("StreamResumes", stream_resumes))
+        wf.set_entry_point("LoadJobRole")
+        wf.add_edge("LoadJobRole", "LoadCulture")
+        wf.add_edge("LoadCulture", "StreamResumes")
+        wf.add_edge("StreamResumes", END)
+        return wf.compile(checkpointer=checkpointer)
+
     # Add nodes for each workflow step, wrapping each function as a runnable
-    wf.add_node("LoadJobRole",    RunnableLambda(load_job_role))      # Load job role information
-    wf.add_node("LoadCulture",    RunnableLambda(load_culture_doc))   # Load company culture document
-    wf.add_node("GetResumes",     RunnableLambda(get_resume_files))   # Fetch resume files
-    wf.add_node("ParseResumes",   RunnableLambda(parse_resume))       # Parse resumes
-    
-    wf.add_node("MatchResumes",   RunnableLambda(match_resumes))      # Match parsed resumes to job/culture
-    wf.add_node("OutputResults",  RunnableLambda(output_results))     # Output the matching results
+    wf.add_node("LoadJobRole",    node("LoadJobRole", load_job_role))      # Load job role information
+    wf.add_node("LoadCulture",    node("LoadCulture", load_culture_doc))   # Load company culture document
+    wf.add_node("GetResumes",     node("GetResumes", get_resume_files))   # Fetch resume files
+    wf.add_node("ParseResumes",   node("ParseResumes", parse_resume))       # Parse resumes
+    wf.add_node("PrefilterResumes", node("PrefilterResumes", prefilter_resumes)) # Local similarity shortlist
+    wf.add_node("CondenseResumes", node("CondenseResumes", condense_resumes))  # Budget resume text for prompts
+
+    wf.add_node("MatchResumes",   node("MatchResumes", match_resumes))      # Match parsed resumes to job/culture
+    wf.add_node("OutputResults",  node("OutputResults", output_results))     # Output the matching results
 
     # Set the entry point of the workflow
     wf.set_entry_point("LoadJobRole")
@@ -36,9 +63,12 @@ def build_graph():
     wf.add_edge("LoadJobRole", "LoadCulture")
     wf.add_edge("LoadCulture", "GetResumes")
     wf.add_edge("GetResumes", "ParseResumes")
-    wf.add_edge("ParseResumes", "MatchResumes")
+    wf.add_edge("ParseResumes", "PrefilterResumes")
+    wf.add_edge("PrefilterResumes", "CondenseResumes")
+    wf.add_edge("CondenseResumes", "MatchResumes")
     wf.add_edge("MatchResumes", "OutputResults")
     wf.add_edge("OutputResults", END)  # Mark the end of the workflow
 
-    # Compile and return the workflow graph
-    return wf.compile()
+    # Compile and return the workflow graph; a checkpointer lets an
+    # interrupted run resume from the last completed node
+    return wf.compile(checkpointer=checkpointer)
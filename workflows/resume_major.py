@@ -0,0 +1,142 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import google.generativeai as genai
+
+from agents.resume_parser import parse_resume
+from agents.prefilter import prefilter_resumes
+from agents.condenser import condense
+from agents.resume_matcher import (
+    job_description, is_resume, score_roles, to_match, error_match, verdict_cache,
+)
+from services.drive import list_resumes
+from services.sheets import write_results_to_results_tab
+from database.mongo import store_results
+from workflows.batch_runner import summarize
+from services.metrics import propagate
+from config.settings import GEMINI_MODEL, GEMINI_CONCURRENCY, GEMINI_MULTI_ROLE
+
+
+def content_key(file):
+    # Copies of one upload in several folders share a checksum, not an id
+    return file.get("md5Checksum") or file.get("id")
+
+def collect_files(roles):
+    """
+    List every role folder. Returns (one file per content key, per-role list
+    of (content key, file) or the exception raised listing that folder).
+    """
+    unique = {}
+    per_role = []
+    for role in roles:
+        try:
+            files = list_resumes(role["folder_id"])
+        except Exception as e:
+            logging.error(f"Error listing folder for role {role['title']}: {e}", exc_info=True)
+            per_role.append(e)
+            continue
+        entries = []
+        for f in files:
+            key = content_key(f)
+            unique.setdefault(key, f)
+            entries.append((key, f))
+        per_role.append(entries)
+    return unique, per_role
+
+def parse_unique(unique):
+    """
+    Parse each distinct file once. Returns {content key: parsed resume} with
+    the condensed prompt text attached.
+    """
+    key_by_id = {f.get("id"): key for key, f in unique.items()}
+    parsed = parse_resume({"resumes": list(unique.values())})["parsed_resumes"]
+    return {key_by_id[r["id"]]: {**r, "condensed": condense(r.get("text", ""))} for r in parsed}
+
+def screen_and_score(r, descs, model, multi_role):
+    """
+    One is_resume verdict for a distinct file, then its scores for every role
+    that shortlisted it. Returns False for non-resumes, an exception if the
+    verdict failed, otherwise scores aligned with `descs`.
+    """
+    try:
+        if not is_resume(r.get("text", ""), model, cache=verdict_cache, condensed=r.get("condensed")):
+            logging.info(f"Skipped non-resume document (name: {r.get('name', 'N/A')})")
+            return False
+    except Exception as e:
+        return e
+    return score_roles(r, descs, model, cache=verdict_cache, multi_role=multi_role)
+
+def run_resume_major(roles, concurrency=GEMINI_CONCURRENCY, multi_role=GEMINI_MULTI_ROLE):
+    """
+    Full sweep that works per distinct resume instead of per role: files are
+    deduplicated by checksum across all role folders, downloaded and parsed
+    once, checked with one is_resume verdict and scored against every role
+    whose prefilter kept them. Results fan back out to each role's Results
+    rows and Mongo. Returns per-role summaries in role order.
+    """
+    start = time.perf_counter()
+    unique, per_role = collect_files(roles)
+    parsed = parse_unique(unique)
+
+    # Per-role views keep each folder's own file name for the Results rows
+    views = []
+    for role, entries in zip(roles, per_role):
+        if isinstance(entries, Exception):
+            views.append(None)
+            continue
+        rows = [{**parsed[key], "name": f.get("name"), "key": key} for key, f in entries if key in parsed]
+        views.append((rows, prefilter_resumes({"job": role, "parsed_resumes": rows})))
+
+    # Which roles shortlisted each distinct file
+    wanted = {}
+    for ri, view in enumerate(views):
+        if view is not None:
+            for row in view[1]["shortlist"]:
+                roles_for = wanted.setdefault(row["key"], [])
+                if ri not in roles_for:
+                    roles_for.append(ri)
+
+    descs = [job_description(role) for role in roles]
+    model = genai.GenerativeModel(GEMINI_MODEL)
+
+    def work(key):
+        return screen_and_score(parsed[key], [descs[ri] for ri in wanted[key]], model, multi_role)
+
+    keys = list(wanted)
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(keys))), thread_name_prefix="gemini") as pool:
+        outcomes = dict(zip(keys, pool.map(propagate(work), keys)))
+
+    total_files = sum(len(entries) for entries in per_role if not isinstance(entries, Exception))
+    logging.info(
+        "Resume-major sweep: %d files across %d roles, %d distinct, %d parsed, %d screened, %d role scores",
+        total_files, len(roles), len(unique), len(parsed), len(keys), sum(len(v) for v in wanted.values())
+    )
+
+    summaries = []
+    for ri, (role, entries, view) in enumerate(zip(roles, per_role, views)):
+        if view is None:
+            summaries.append(summarize(role, {}, f"failed: {type(entries).__name__}", time.perf_counter() - start))
+            continue
+        rows, filtered = view
+        matches = []
+        for row in filtered["shortlist"]:
+            outcome = outcomes[row["key"]]
+            if outcome is False:
+                continue
+            if isinstance(outcome, Exception):
+                matches.append(error_match(row, outcome))
+                continue
+            data = outcome[wanted[row["key"]].index(ri)]
+            matches.append(error_match(row, data) if isinstance(data, Exception) else to_match(row, data))
+        matches += filtered["prefiltered"]
+        values = {"resumes": entries, "parsed_resumes": rows, "matches": matches}
+        try:
+            write_results_to_results_tab(role["title"], matches)
+            store_results(role["title"], matches)
+            outcome = "done"
+        except Exception as e:
+            logging.error(f"Error writing results for role {role['title']}: {e}", exc_info=True)
+            outcome = f"failed: {type(e).__name__}"
+        summaries.append(summarize(role, values, outcome, time.perf_counter() - start))
+    return summaries
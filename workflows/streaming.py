@@ -0,0 +1,221 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+import google.generativeai as genai
+
+from agents.resume_parser import (
+    document_key, is_supported, too_large, parsed_store, get_pool, run_extraction, skills_for,
+)
+from agents.prefilter import prefilter_resumes
+from agents.condenser import condense_resumes
+from agents.resume_matcher import (
+    score_resumes, split_near_duplicates, record_near_duplicates,
+)
+from services.drive import download_bytes, list_resumes
+from services.sheets import write_results_to_results_tab, results_row_counts
+from database.mongo import store_results
+from services.metrics import propagate
+from config.settings import (
+    GEMINI_MODEL, NEAR_DUPLICATE_ACTION, PARSE_WORKERS, PREFILTER_TOP_K,
+    STREAM_BUFFER_SIZE, STREAM_BATCH_SIZE, STREAM_FLUSH_SECONDS,
+)
+
+# End-of-stream marker passed down each buffer
+DONE = object()
+
+
+def fetch(files, outbox):
+    """
+    Stage 1: pass stored parses straight through and download the rest.
+    Blocks when the parse stage falls behind, so at most STREAM_BUFFER_SIZE
+    downloaded files are held in memory.
+    """
+    for file in files:
+        fid, name = file.get("id"), file.get("name")
+        key = document_key(file)
+        stored = parsed_store.get(key) if key else None
+        if stored is not None:
+            outbox.put({"id": fid, "name": name, "text": stored["text"], "skills": stored["skills"]})
+            continue
+        if not is_supported(file):
+            logging.warning("Unsupported file type: %s", name)
+            continue
+        if too_large(file):
+            logging.warning("Skipping oversized file (%s bytes): %s", file.get("size"), name)
+            continue
+        try:
+            data = download_bytes(fid)
+        except Exception as e:
+            logging.error("Failed to download file '%s': %s", name, e, exc_info=True)
+            continue
+        if too_large(file, data):
+            logging.warning("Skipping oversized file (%d bytes): %s", len(data), name)
+            continue
+        outbox.put((fid, name, data, key))
+
+def parse(inbox, outbox):
+    """
+    Stage 2: extract text on the shared process pool, one file at a time per
+    thread, and pass parsed resumes on.
+    """
+    while True:
+        item = inbox.get()
+        if item is DONE:
+            inbox.put(DONE)  # let sibling parse threads see it too
+            return
+        if isinstance(item, dict):
+            outbox.put(item)
+            continue
+        fid, name, data, key = item
+        result = run_extraction([(name, data)], get_pool())[0]
+        if isinstance(result, Exception):
+            logging.error("Error parsing file '%s': %s", name, result, exc_info=result)
+            continue
+        skills = skills_for([result], [name])[0]
+        if key:
+            parsed_store.set(key, {"text": result, "skills": skills})
+        outbox.put({"id": fid, "name": name, "text": result, "skills": skills})
+
+def micro_batches(inbox, size=STREAM_BATCH_SIZE, wait=STREAM_FLUSH_SECONDS):
+    """
+    Group items from `inbox` into lists of up to `size`, emitting a partial
+    batch once `wait` seconds pass without filling it.
+    """
+    batch, deadline = [], None
+    while True:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            item = inbox.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+        if item is DONE:
+            if batch:
+                yield batch
+            return
+        if item is not None:
+            batch.append(item)
+            deadline = deadline or time.monotonic() + wait
+        if batch and (len(batch) >= size or item is None):
+            yield batch
+            batch, deadline = [], None
+
+def score(job, model, inbox, outbox, parsed, failures):
+    """
+    Stage 3: prefilter, condense and score each micro-batch of parsed
+    resumes, then hand its matches to the writer. Records the id and name
+    of every resume scored in `parsed`, and counts the resumes of batches
+    that failed in `failures["score"]`.
+    """
+    for batch in micro_batches(inbox):
+        try:
+            filtered = prefilter_resumes({"job": job, "parsed_resumes": batch})
+            shortlist = condense_resumes({"job": job, "shortlist": filtered["shortlist"]})["shortlist"]
+            to_score, reused, fresh = split_near_duplicates(shortlist, job)
+            matches = score_resumes(to_score, job, model) + reused + filtered["prefiltered"]
+            if NEAR_DUPLICATE_ACTION != "off":
+                record_near_duplicates(fresh, job)
+        except Exception as e:
+            failures["score"] += len(batch)
+            logging.error(f"Error scoring a batch of {len(batch)} resumes for {job['title']}: {e}", exc_info=True)
+            continue
+        parsed.extend({"id": r.get("id"), "name": r.get("name")} for r in batch)
+        outbox.put(matches)
+    outbox.put(DONE)
+
+def write(job, inbox, written, failures, replaceable):
+    """
+    Stage 4: flush matches to the Results tab and Mongo as they arrive,
+    merging whatever has queued up behind a slow write into one flush.
+    Flushes only replace the Results rows counted in `replaceable` before
+    the run, never rows an earlier flush wrote. Every match received goes
+    into `written`; results a flush failed to write are counted in
+    `failures["sheets"]` / `failures["mongo"]`.
+    """
+    finished = False
+    while not finished:
+        pending = []
+        item = inbox.get()
+        while True:
+            if item is DONE:
+                finished = True
+                break
+            pending.extend(item)
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+        if not pending:
+            continue
+        written.extend(pending)
+        try:
+            write_results_to_results_tab(job["title"], pending, replaceable)
+        except Exception as e:
+            failures["sheets"] += len(pending)
+            logging.error(f"Error writing {len(pending)} results to the Results tab for {job['title']}: {e}", exc_info=True)
+        try:
+            store_results(job["title"], pending)
+        except Exception as e:
+            failures["mongo"] += len(pending)
+            logging.error(f"Error storing {len(pending)} results in MongoDB for {job['title']}: {e}", exc_info=True)
+        logging.info(f"Flushed {len(pending)} results for {job['title']} ({len(written)} so far)")
+
+def stream_resumes(state):
+    """
+    Download, parse, score and write resumes as a pipeline of threads joined
+    by bounded queues, so the first results land while later files are still
+    downloading and no stage holds the whole folder. Replaces GetResumes
+    through OutputResults when STREAMING_PIPELINE is set.
+
+    The prefilter threshold applies per micro-batch and top-K is not
+    applied, since the role's full ranking is only known once every resume
+    has streamed through. When a batch cannot be scored or a flush to the
+    Results tab fails this raises, so the run is retried (the parse and
+    verdict caches make the retry cheap); when only a Mongo flush failed it
+    returns `stored: False` and the caller stores the matches itself.
+    """
+    job = state["job"]
+    files = state.get("resumes") or list_resumes(job["folder_id"])
+    logging.info(f"Streaming {len(files)} files for job title {job['title']}")
+    top_k = int(job.get("prefilter_top_k", PREFILTER_TOP_K))
+    if top_k > 0:
+        logging.warning(f"Prefilter top_k {top_k} for {job['title']} is not applied in streaming mode")
+    scoring_job = {**job, "prefilter_top_k": 0}
+
+    downloaded = queue.Queue(maxsize=STREAM_BUFFER_SIZE)
+    parsed = queue.Queue(maxsize=STREAM_BUFFER_SIZE)
+    scored = queue.Queue(maxsize=STREAM_BUFFER_SIZE)
+    written = []
+    parsed_files = []
+    failures = Counter()
+    replaceable = results_row_counts(job["title"])
+    model = genai.GenerativeModel(GEMINI_MODEL)
+
+    parsers = [
+        threading.Thread(target=propagate(parse), args=(downloaded, parsed), name=f"stream-parse-{i}", daemon=True)
+        for i in range(max(1, PARSE_WORKERS))
+    ]
+    scorer = threading.Thread(target=propagate(score), args=(scoring_job, model, parsed, scored, parsed_files, failures), name="stream-score", daemon=True)
+    writer = threading.Thread(target=propagate(write), args=(job, scored, written, failures, replaceable), name="stream-write", daemon=True)
+    for t in parsers + [scorer, writer]:
+        t.start()
+
+    try:
+        fetch(files, downloaded)
+    finally:
+        downloaded.put(DONE)
+        for t in parsers:
+            t.join()
+        parsed.put(DONE)
+        scorer.join()
+        writer.join()
+    logging.info(f"Streaming finished for {job['title']}: {len(written)} results written")
+    if failures["score"] or failures["sheets"]:
+        raise RuntimeError(
+            f"Streaming {job['title']}: {failures['score']} resumes not scored, "
+            f"{failures['sheets']} results not written to the Results tab"
+        )
+    # Only ids and names of the scored files; their text is not kept
+    return {"resumes": files, "parsed_resumes": parsed_files, "matches": written, "stored": not failures["mongo"]}